@@ -0,0 +1,167 @@
+from abc import ABC, abstractmethod
+
+from events import (EventBus, GameReset, LinesCleared, NextChanged, PieceHeld, PieceLocked,
+                    PieceMoved, PieceRotated, PieceSpawned, PieceState)
+from grid import Grid
+from piece import Block, Piece, PType
+
+
+class Style(ABC):
+    """An abstract class to allow for multiple styles of Tetris, a style draws only from
+    the events of the game, which are buffered and drawn once per frame by render
+    """
+
+    name = "Undefined"
+
+    def __init__(self, grid: Grid):
+        self.grid = grid
+        self.events = None  # EventQueue of the game's events, see attach
+        self.active_piece = None  # The style's own copy of the active piece
+
+    def attach(self, bus: EventBus) -> None:
+        """Buffers every event of the bus until the next render"""
+        self.events = bus.queue()
+
+    def render(self) -> None:
+        """Draws the events buffered since the last frame, only the last move and
+        rotation of each piece are drawn
+        """
+        for event in self.events.drain(True):
+            self.handle(event)
+
+    def handle(self, event) -> None:
+        """Draws the result of an event emitted by Game"""
+        match event:
+            case PieceSpawned(piece=state):
+                self.active_piece = None  # The last piece was locked, held or reset
+                self.draw_active(state)
+            case PieceMoved(piece=state) | PieceRotated(piece=state):
+                self.draw_active(state)
+            case PieceLocked(piece=state, cells=cells):
+                self.draw_locked(state, cells)
+            case LinesCleared(row_map=row_map):
+                self.clear_lines(row_map)
+            case PieceHeld(hold_type=hold_type, piece=state):
+                self.draw_hold(hold_type)
+                self.active_piece = None
+                self.draw_active(state)
+            case NextChanged(pieces=pieces):
+                self.draw_next(list(pieces))
+            case GameReset():
+                self.clear_board()
+                self.draw_boundaries()
+
+    def track(self, state: PieceState) -> Piece:
+        """Moves the style's copy of the active piece to state, creating it for a new piece"""
+        if self.active_piece is None:
+            self.active_piece = Piece(state.x, None, state.type)
+        piece = self.active_piece
+        piece.x, piece.y = state.x, state.y
+        piece.set_rotate(state.rotation)
+        return piece
+
+    def draw_active(self, state: PieceState) -> None:
+        """Draws the active piece at state"""
+        piece = self.track(state)
+        piece.blocks = self.draw_piece(piece, True)
+
+    def draw_locked(self, state: PieceState, cells: tuple[tuple[int, int], ...]) -> None:
+        """Draws the active piece locked at state, filling cells of the board"""
+        # pylint: disable=unused-argument
+        self.draw_piece(self.track(state))
+        self.active_piece = None
+
+    @abstractmethod
+    def draw_piece(self, piece: Piece, active=False) -> list[Block]:
+        """Draws the specified piece on the canvas using its internal coordinates
+        isActive is intended to allow for support for shadow/preview pieces
+        """
+
+    @abstractmethod
+    def draw_boundaries(self) -> None:
+        """Draws the boundaries of the grid, can also be used to stylize
+        boundaries, grid, etc."""
+
+    @abstractmethod
+    def draw_block(self, x, y) -> str:
+        """Intended to draw a single block at a given coordinate, should be a generic method that
+        returns a string ID that can be used to update the block later
+        """
+
+    @abstractmethod
+    def coord_pixel(self, x, y) -> tuple[int, int]:
+        """Converts a coordinate to a pixel"""
+
+    @abstractmethod
+    def pixel_coord(self, x, y) -> tuple[int, int]:
+        """Converts a pixel to a coordinate"""
+
+    @abstractmethod
+    def clear_lines(self, row_map: tuple[int, ...]) -> None:
+        """Clears the lines that have been filled, row_map is the new y of every old row
+        (None for cleared rows), see LinesCleared
+        """
+
+    @abstractmethod
+    def clear_board(self) -> None:
+        """Clears the entire board, should reset the board to an empty grid"""
+
+    @abstractmethod
+    def draw_board(self, cells: tuple[bytes, ...]) -> None:
+        """Draws the filled cells (see Grid.snapshot) in place of the current board,
+        e.g. after Game.restore which emits no events
+        """
+
+    @abstractmethod
+    def draw_next(self, pieces: list[PType]) -> None:
+        """Draws the next piece(s) in the queue, the next piece is first"""
+
+    @abstractmethod
+    def draw_hold(self, hold_type: PType) -> None:
+        """Draws the hold piece, the active piece was swapped into it so it is removed"""
+
+
+class NullStyle(Style):
+    """A style that draws nothing, used to run the game without a display"""
+    name = "Null"
+
+    def draw_piece(self, piece: Piece, active=False) -> list[Block]:
+        if active:
+            return piece.blocks
+        return [Block(piece.type, piece.x + x, piece.y + y, None) for x, y in piece.get_coords()]
+
+    def attach(self, bus: EventBus) -> None:
+        pass  # Nothing is drawn, so nothing is buffered
+
+    def render(self) -> None:
+        pass
+
+    def handle(self, event) -> None:
+        pass
+
+    def draw_boundaries(self) -> None:
+        pass
+
+    def draw_block(self, x, y) -> str:
+        return None
+
+    def coord_pixel(self, x, y) -> tuple[int, int]:
+        return x, y
+
+    def pixel_coord(self, x, y) -> tuple[int, int]:
+        return x, y
+
+    def clear_lines(self, row_map: tuple[int, ...]) -> None:
+        pass
+
+    def clear_board(self) -> None:
+        pass
+
+    def draw_board(self, cells: tuple[bytes, ...]) -> None:
+        pass
+
+    def draw_next(self, pieces: list[PType]) -> None:
+        pass
+
+    def draw_hold(self, hold_type: PType) -> None:
+        pass
@@ -0,0 +1,94 @@
+"""Runs many seeded headless games in parallel across a process pool."""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, NamedTuple
+
+from game import Action
+from grid import Grid
+from headless import Engine
+
+ACTIONS = [action for action in Action if action not in (Action.PAUSE, Action.RESET)] + [None]
+
+
+class GameResult(NamedTuple):
+    """Aggregates of a single simulated game"""
+    seed: int
+    lines: int
+    pieces: int
+    top_out_tick: int  # None if the game never topped out
+    ticks: int
+    seconds: float
+
+    @property
+    def ticks_per_sec(self) -> float:
+        """Number of game ticks simulated per second of wall time"""
+        return self.ticks / self.seconds if self.seconds else 0.0
+
+
+def random_policy(engine: Engine, rng: random.Random) -> Action:
+    """Picks a uniformly random action (or no action), the default policy"""
+    # pylint: disable=unused-argument
+    return rng.choice(ACTIONS)
+
+
+def run_game(seed: int, steps: int = 10000, width: int = 10, height: int = 20,
+             policy: Callable[[Engine, random.Random], Action] = random_policy) -> GameResult:
+    """Runs a single game until it tops out or the step limit is reached,
+    the policy must be a module level function so it can be sent to workers
+    """
+    engine = Engine(Grid(width, height), seed)
+    rng = random.Random(seed)
+    lines = pieces = ticks = 0
+    top_out_tick = None
+    start = time.perf_counter()
+    for _step in range(steps):
+        result = engine.step(policy(engine, rng))
+        ticks += engine.game.gravity
+        if result.topped_out:
+            top_out_tick = ticks
+            break
+        lines += result.cleared
+        pieces += result.locked
+    return GameResult(seed, lines, pieces, top_out_tick, ticks, time.perf_counter() - start)
+
+
+def run_batch(seeds: list[int], workers: int = None, **kwargs) -> list[GameResult]:
+    """Runs a game for every seed, sharded across a pool of worker processes,
+    keyword arguments are passed to run_game, results are in the same order as the seeds
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(seeds) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(partial(run_game, **kwargs), seeds, chunksize=chunksize))
+
+
+def main() -> None:
+    """Command line entry point, prints a summary of the batch"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--height", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_batch(list(range(args.seed, args.seed + args.games)), args.workers,
+                        steps=args.steps, width=args.width, height=args.height)
+    elapsed = time.perf_counter() - start
+    ticks = sum(result.ticks for result in results)
+    print(f'Games: {len(results)} in {elapsed:.2f}s')
+    print(f'Lines: {sum(result.lines for result in results) / len(results):.2f} avg')
+    print(f'Pieces: {sum(result.pieces for result in results) / len(results):.2f} avg')
+    print(f'Top outs: {sum(result.top_out_tick is not None for result in results)}')
+    print(f'Ticks/sec: {ticks / elapsed:.0f} total, '
+          f'{sum(result.ticks_per_sec for result in results) / len(results):.0f} per game')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""Benchmarks the hot paths of the engine and compares the results against a baseline."""
+import argparse
+import gc
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+from typing import Callable, NamedTuple
+
+from basestyle import NullStyle
+from batch import random_policy
+from game import Action, Game
+from grid import Grid
+from headless import Engine
+from piece import Piece, PType, generate_piece
+from style import RasterStyle, RGBStyle
+
+
+class Benchmark(NamedTuple):
+    """A benchmark, setup returns the function to time (called number times per repeat)
+    or a (prepare, run) pair where prepare is called before every run and not timed
+    """
+    name: str
+    setup: Callable[[], Callable[[], None] | tuple[Callable[[], None], Callable[[], None]]]
+    number: int
+
+
+BENCHMARKS = []
+
+
+def benchmark(name: str, number: int):
+    """Registers the decorated setup function as a benchmark"""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, setup, number))
+        return setup
+    return register
+
+
+class StubImage:
+    """Stand-in for a Tk PhotoImage that only counts the pixel data it is given"""
+
+    def __init__(self) -> None:
+        self.puts = 0
+
+    def put(self, data, to=None) -> None:
+        """Counts the call"""
+        # pylint: disable=unused-argument
+        self.puts += 1
+
+    def configure(self, **options) -> None:
+        """Ignores the new size"""
+
+
+class StubCanvas:
+    """Stand-in for a Tk canvas that only keeps the state the styles use,
+    so rendering can be benchmarked without a display
+    """
+
+    def __init__(self, width: int = 400, height: int = 500) -> None:
+        self.width = width
+        self.height = height
+        self.ids = itertools.count(1)
+        self.items = {}  # ID -> [coords, options, tags]
+        self.idle = []  # Callbacks waiting for update_idletasks
+        self.timers = {}  # ID -> callback waiting for run_timers
+
+    def after_idle(self, func) -> None:
+        """Queues func until update_idletasks is called"""
+        self.idle.append(func)
+
+    def after(self, delay: int, func) -> str:
+        """Queues func until run_timers is called, the delay is ignored"""
+        # pylint: disable=unused-argument
+        uid = f'after#{next(self.ids)}'
+        self.timers[uid] = func
+        return uid
+
+    def after_cancel(self, uid: str) -> None:
+        """Cancels a callback queued by after"""
+        self.timers.pop(uid, None)
+
+    def run_timers(self) -> None:
+        """Runs the callbacks queued by after as if their delay had passed"""
+        timers, self.timers = self.timers, {}
+        for func in timers.values():
+            func()
+
+    def update_idletasks(self) -> None:
+        """Runs the queued idle callbacks, like Tk does once per event loop iteration"""
+        idle, self.idle = self.idle, []
+        for func in idle:
+            func()
+
+    def bind(self, *args, **kwargs) -> None:
+        """Events are never fired"""
+
+    def winfo_reqwidth(self) -> int:
+        """Returns the requested width"""
+        return self.width
+
+    def winfo_reqheight(self) -> int:
+        """Returns the requested height"""
+        return self.height
+
+    def create_rectangle(self, *coords, tags=(), **options) -> int:
+        """Creates an item and returns its ID"""
+        uid = next(self.ids)
+        self.items[uid] = [coords, options, (tags,) if isinstance(tags, str) else tags]
+        return uid
+
+    create_text = create_rectangle
+
+    def find_withtag(self, tag) -> tuple[int, ...]:
+        """Returns the IDs of the items with the tag (or the ID itself)"""
+        if tag == "all":
+            return tuple(self.items)
+        if isinstance(tag, int):
+            return (tag,) if tag in self.items else ()
+        return tuple(uid for uid, item in self.items.items() if tag in item[2])
+
+    def coords(self, tag, *coords) -> None:
+        """Moves the items with the tag"""
+        for uid in self.find_withtag(tag):
+            self.items[uid][0] = coords
+
+    def itemconfig(self, tag, **options) -> None:
+        """Updates the options of the items with the tag"""
+        for uid in self.find_withtag(tag):
+            self.items[uid][1].update(options)
+
+    def delete(self, tag) -> None:
+        """Deletes the items with the tag"""
+        for uid in self.find_withtag(tag):
+            del self.items[uid]
+
+
+def garbage_grid(width: int = 10, height: int = 20, rows: int = 8, seed: int = 0) -> Grid:
+    """Returns a grid whose bottom rows are filled except for one random hole each"""
+    grid = Grid(width, height)
+    rng = random.Random(seed)
+    cells = [bytes(width)] * (height - rows)
+    for _row in range(rows):
+        row = bytearray([PType.Z.value] * width)
+        row[rng.randrange(width)] = 0
+        cells.append(bytes(row))
+    grid.restore(tuple(cells))
+    return grid
+
+
+@benchmark("grid.try_fit", 10000)
+def bench_try_fit() -> Callable[[], None]:
+    """Fits a piece at every column and height of a partially filled board"""
+    grid = garbage_grid()
+    piece = Piece(0, None, PType.T)
+    positions = itertools.cycle([(x, y) for y in range(grid.height) for x in range(-1, grid.width)])
+
+    def run():
+        piece.x, piece.y = next(positions)
+        grid.try_fit(piece)
+    return run
+
+
+@benchmark("grid.try_fit_kick", 10000)
+def bench_try_fit_kick() -> Callable[[], None]:
+    """Tries rotations next to the walls, which go through the wall kick tests"""
+    grid = garbage_grid()
+    piece = Piece(0, None, PType.I)
+    piece.set_rotate(1)
+    positions = itertools.cycle([(x, y) for y in range(10) for x in (-1, grid.width - 2)])
+
+    def run():
+        piece.x, piece.y = next(positions)
+        grid.try_fit(piece, 2)
+    return run
+
+
+@benchmark("grid.drop_distance", 10000)
+def bench_drop_distance() -> Callable[[], None]:
+    """Finds the landing row (like the ghost and hard drop do) from the top of the board"""
+    grid = garbage_grid()
+    positions = itertools.cycle([(ptype, rotation, x) for ptype in PType for rotation in range(4)
+                                 for x in range(grid.width) if grid.fits(ptype, rotation, x, 0)])
+
+    def run():
+        ptype, rotation, x = next(positions)
+        grid.drop_distance(ptype, rotation, x, 0)
+    return run
+
+
+@benchmark("grid.clear_lines", 2000)
+def bench_clear_lines() -> tuple[Callable[[], None], Callable[[], None]]:
+    """Clears four full lines between garbage rows, the board is restored before
+    every call outside of the timed part
+    """
+    grid = garbage_grid()
+    cells = list(grid.snapshot())
+    for y in (12, 14, 16, 19):
+        cells[y] = bytes([PType.I.value] * grid.width)
+    cells = tuple(cells)
+    return lambda: grid.restore(cells), grid.clear_lines
+
+
+@benchmark("piece.generate_piece", 10000)
+def bench_generate_piece() -> Callable[[], None]:
+    """Generates the grid of every piece type"""
+    types = itertools.cycle(PType)
+    return lambda: generate_piece(next(types))
+
+
+@benchmark("game.get_next_piece", 10000)
+def bench_get_next_piece() -> Callable[[], None]:
+    """Draws pieces from the randomizer"""
+    grid = Grid(10, 20)
+    game = Game(NullStyle(grid), grid, 0)
+    return game.get_next_piece
+
+
+def create_style(name: str, grid: Grid) -> RGBStyle | RasterStyle:
+    """Returns the named style drawing on a stub canvas"""
+    canvas = StubCanvas()
+    if name == "raster":
+        return RasterStyle(grid, canvas, StubImage())
+    return RGBStyle(grid, canvas)
+
+
+def draw_piece(name: str) -> Callable[[], None]:
+    """Redraws a moving active piece (and its ghost) with the named style"""
+    grid = garbage_grid()
+    style = create_style(name, grid)
+    piece = Piece(grid.width // 2 - 1, style, PType.T)
+    moves = itertools.cycle([(-1, 0), (1, 0), (1, 0), (-1, 0), (0, 1), (0, -1)])
+
+    def run():
+        dx, dy = next(moves)
+        piece.x += dx
+        piece.y += dy
+        piece.blocks = style.draw_piece(piece, True)
+        style.canvas.update_idletasks()
+    return run
+
+
+def render(name: str) -> Callable[[], None]:
+    """Ticks and renders 3000 frames of a seeded game with random inputs with the named style"""
+    actions = [action for action in Action if action not in (Action.PAUSE, Action.RESET)]
+
+    def run():
+        grid = Grid(10, 20)
+        style = create_style(name, grid)
+        game = Game(style, grid, 0)
+        rng = random.Random(0)
+        for frame in range(3000):
+            if frame % 5 == 0:
+                game.input(rng.choice(actions))
+            game.tick()
+            game.render()
+            style.canvas.update_idletasks()
+    return run
+
+
+def resize(name: str) -> Callable[[], None]:
+    """Sends the style 20 resize events, like dragging the window edge does,
+    and lays out the final size with a partially filled board
+    """
+    grid = garbage_grid()
+    style = create_style(name, grid)
+    style.draw_board(grid.snapshot())
+    sizes = itertools.cycle([(400, 500), (600, 700)])
+
+    def run():
+        canvas = style.canvas
+        for step in range(20):
+            canvas.width, canvas.height = next(sizes)
+            canvas.width += step
+            style.resize(None)
+        canvas.run_timers()
+        canvas.update_idletasks()
+    return run
+
+
+benchmark("style.draw_piece", 2000)(lambda: draw_piece("rgb"))
+benchmark("style.raster_draw_piece", 2000)(lambda: draw_piece("raster"))
+benchmark("style.resize", 100)(lambda: resize("rgb"))
+benchmark("style.raster_resize", 100)(lambda: resize("raster"))
+
+
+@benchmark("macro.headless_game", 1)
+def bench_headless_game() -> Callable[[], None]:
+    """Plays 5000 steps of a seeded headless game with random inputs"""
+    def run():
+        engine = Engine(Grid(10, 20), 0)
+        rng = random.Random(0)
+        for _step in range(5000):
+            engine.step(random_policy(engine, rng))
+    return run
+
+benchmark("macro.render", 1)(lambda: render("rgb"))
+benchmark("macro.render_raster", 1)(lambda: render("raster"))
+
+
+def run_benchmarks(names: list[str] = None, repeat: int = 5) -> dict:
+    """Runs the benchmarks (all if names is None) and returns the results,
+    times are the seconds per call of the fastest and median repeat
+    """
+    results = {}
+    for bench in BENCHMARKS:
+        if names and not any(bench.name.startswith(name) for name in names):
+            continue
+        func = bench.setup()
+        if isinstance(func, tuple):
+            times = sorted(repeat_prepared(*func, repeat, bench.number))
+        else:
+            times = sorted(timeit.Timer(func).repeat(repeat, bench.number))
+        results[bench.name] = {
+            "best": times[0] / bench.number,
+            "median": times[len(times) // 2] / bench.number,
+            "number": bench.number,
+            "repeat": repeat,
+        }
+    return results
+
+
+def repeat_prepared(prepare: Callable[[], None], run: Callable[[], None],
+                    repeat: int, number: int) -> list[float]:
+    """Same as timeit.Timer.repeat but calls prepare before every call of run,
+    only run is timed
+    """
+    clock = time.perf_counter
+    totals = []
+    enabled = gc.isenabled()
+    gc.disable()  # Like timeit
+    try:
+        for _repeat in range(repeat):
+            total = 0.0
+            for _call in range(number):
+                prepare()
+                start = clock()
+                run()
+                total += clock() - start
+            totals.append(total)
+    finally:
+        if enabled:
+            gc.enable()
+    return totals
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints the results next to the baseline and returns the names of benchmarks
+    whose best time is more than threshold (a fraction) slower than the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f'{name:24} {format_time(result["best"]):>10}  (not in baseline)')
+            continue
+        ratio = result["best"] / baseline[name]["best"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f'{name:24} {format_time(result["best"]):>10} '
+              f'vs {format_time(baseline[name]["best"]):>10} ({ratio:.2f}x){flag}')
+    return regressions
+
+
+def format_time(seconds: float) -> str:
+    """Formats a duration with an appropriate unit"""
+    if seconds >= 1:
+        return f'{seconds:.2f}s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds * 1e6:.2f}us'
+
+
+def main() -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", help="only run benchmarks starting with these names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown (fraction) reported as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.names, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "results": results}, file, indent=2)
+    if not args.compare:
+        for name, result in results.items():
+            print(f'{name:24} {format_time(result["best"]):>10} '
+                  f'(median {format_time(result["median"])})')
+        return
+    with open(args.compare, encoding="utf-8") as file:
+        baseline = json.load(file)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from grid import Grid
+from piece import Piece, Shape
+
+
+class BitGrid(Grid):
+    """Bitboard representation of the game board, each row is stored as an integer
+    where bit x is set if the cell at x is filled, cells holds the piece types as in Grid
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.full_row = (1 << width) - 1
+        self.rows = [0] * height
+
+    def get_grid(self) -> list[list[bool]]:
+        """Returns the grid, built from the row bitmasks"""
+        return [[bool(row >> x & 1) for x in range(self.width)] for row in self.rows]
+
+    def is_block(self, x: int, y: int) -> bool:
+        return bool(self.rows[y] >> x & 1)
+
+    def shape_fits(self, shape: Shape, x: int, y: int) -> bool:
+        min_x, min_y, max_x, max_y = shape.bounds
+        if x + min_x < 0 or x + max_x >= self.width or y + min_y < 0 or y + max_y >= self.height:
+            return False
+        shift = x + min_x
+        for dy, mask in shape.rows:
+            if self.rows[y + dy] & mask << shift:
+                return False
+        return True
+
+    def add_piece(self, piece: Piece) -> None:
+        super().add_piece(piece)
+        for x, y in piece.get_coords():
+            self.rows[piece.y + y] |= 1 << (piece.x + x)
+
+    def is_full(self, y: int) -> bool:
+        return self.rows[y] == self.full_row
+
+    def compact(self, kept: list[int], cleared: int) -> None:
+        self.rows = [0] * cleared + [self.rows[y] for y in kept]
+        super().compact(kept, cleared)
+
+    def restore(self, cells: tuple[bytes, ...]) -> None:
+        super().restore(cells)
+        self.rows = [sum(1 << x for x, cell in enumerate(row) if cell) for row in cells]
+
+    def clear(self) -> None:
+        self.rows = [0] * self.height
+        super().clear()
@@ -0,0 +1,79 @@
+"""Vectorized representation of many boards at once, requires numpy."""
+import numpy as np
+
+from grid import Grid
+from piece import SHAPES, PType
+
+
+class BoardBatch:
+    """Stack of boards stored as a (batch, height, width) uint8 array
+    where filled cells are 1 and empty cells are 0
+    """
+
+    def __init__(self, cells: np.ndarray) -> None:
+        self.cells = cells
+        self.size, self.height, self.width = cells.shape
+
+    @classmethod
+    def from_grids(cls, grids: list[Grid]) -> "BoardBatch":
+        """Stacks the given grids, which must all have the same dimensions"""
+        height, width = grids[0].height, grids[0].width
+        cells = np.frombuffer(b"".join(b"".join(grid.cells) for grid in grids), dtype=np.uint8)
+        return cls((cells.reshape(len(grids), height, width) != 0).astype(np.uint8))
+
+    @classmethod
+    def empty(cls, size: int, width: int, height: int) -> "BoardBatch":
+        """Creates a batch of empty boards"""
+        return cls(np.zeros((size, height, width), dtype=np.uint8))
+
+    def copy(self) -> "BoardBatch":
+        """Returns a copy of the batch that does not share cells"""
+        return BoardBatch(self.cells.copy())
+
+    def try_fit(self, ptype: PType, rotation: int, x: int, y: int) -> np.ndarray:
+        """Returns a (batch,) bool array of whether the piece fits at x, y on each board"""
+        shape = SHAPES[ptype][rotation % 4]
+        min_x, min_y, max_x, max_y = shape.bounds
+        if (x + min_x < 0 or x + max_x >= self.width
+                or y + min_y < 0 or y + max_y >= self.height):
+            return np.zeros(self.size, dtype=bool)
+        xs, ys = shape.grid
+        return ~self.cells[:, np.add(ys, y), np.add(xs, x)].any(axis=1)
+
+    def add_piece(self, ptype: PType, rotation: int, x: int, y: int,
+                  where: np.ndarray = None) -> None:
+        """Adds the piece at x, y to every board, or only to the boards selected by where"""
+        xs, ys = SHAPES[ptype][rotation % 4].grid
+        boards = np.arange(self.size) if where is None else np.flatnonzero(where)
+        self.cells[boards[:, None], np.add(ys, y), np.add(xs, x)] = 1
+
+    def full_rows(self) -> np.ndarray:
+        """Returns a (batch, height) bool array of which rows are full"""
+        return self.cells.all(axis=2)
+
+    def clear_lines(self) -> np.ndarray:
+        """Clears all full lines on every board and returns the (batch,) number cleared"""
+        full = self.full_rows()
+        cleared = full.sum(axis=1)
+        if not cleared.any():
+            return cleared
+        # Stable sort moves full rows to the top while keeping the other rows in order
+        order = np.argsort(~full, axis=1, kind="stable")
+        self.cells = np.take_along_axis(self.cells, order[:, :, None], axis=1)
+        self.cells[np.arange(self.height)[None, :] < cleared[:, None]] = 0
+        return cleared
+
+    def heights(self) -> np.ndarray:
+        """Returns a (batch, width) array of the height of every column"""
+        filled = self.cells.astype(bool)
+        top = filled.argmax(axis=1)
+        return np.where(filled.any(axis=1), self.height - top, 0)
+
+    def holes(self) -> np.ndarray:
+        """Returns the (batch,) number of empty cells with a filled cell above them"""
+        covered = np.maximum.accumulate(self.cells, axis=1)
+        return (covered > self.cells).sum(axis=(1, 2))
+
+    def bumpiness(self) -> np.ndarray:
+        """Returns the (batch,) sum of height differences between neighbouring columns"""
+        return np.abs(np.diff(self.heights(), axis=1)).sum(axis=1)
@@ -0,0 +1,210 @@
+"""Autoplay agent that places pieces using a heuristic search with lookahead."""
+import argparse
+import time
+from typing import NamedTuple
+
+from bitgrid import BitGrid
+from cache import LRUCache
+from game import Action, Game
+from grid import Grid
+from headless import Engine
+from piece import SHAPES, PType
+from placement import Placement, enumerate_placements, find_path
+from randomizer import GENERATORS
+from zobrist import hash_row, hash_rows, zobrist_keys
+
+
+class Weights(NamedTuple):
+    """Weights of the board features used by evaluate, higher scores are better"""
+    height: float = -0.510066
+    lines: float = 0.760666
+    holes: float = -0.35663
+    bumpiness: float = -0.184483
+
+
+def evaluate(rows: tuple[int, ...], width: int, weights: Weights) -> float:
+    """Scores a board given as row bitmasks (excluding cleared lines)"""
+    heights = {}
+    holes = 0
+    seen = 0  # Columns that have a filled cell above the current row
+    for y, row in enumerate(rows):
+        new = row & ~seen
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = len(rows) - y
+            new ^= low
+        holes += (seen & ~row).bit_count()
+        seen |= row
+    columns = [heights.get(x, 0) for x in range(width)]
+    bumpiness = sum(abs(columns[x] - columns[x + 1]) for x in range(width - 1))
+    return weights.height * sum(columns) + weights.holes * holes + weights.bumpiness * bumpiness
+
+
+def place(rows: tuple[int, ...], zobrist: int, placement: Placement, full_row: int,
+          keys: tuple[tuple[int, ...], ...]) -> tuple[tuple[int, ...], int, int]:
+    """Returns the rows after locking the placement and clearing lines, their Zobrist hash
+    (updated incrementally unless lines were cleared) and the number of lines cleared
+    """
+    shape = SHAPES[placement.type][placement.rotation]
+    shift = placement.x + shape.bounds[0]
+    new_rows = list(rows)
+    for dy, mask in shape.rows:
+        new_rows[placement.y + dy] |= mask << shift
+        zobrist ^= hash_row(mask << shift, keys[placement.y + dy])
+    kept = [row for row in new_rows if row != full_row]
+    cleared = len(rows) - len(kept)
+    if cleared == 0:
+        return tuple(new_rows), zobrist, 0
+    new_rows = (0,) * cleared + tuple(kept)
+    return new_rows, hash_rows(new_rows, keys), cleared
+
+
+class Bot:
+    """Picks the placement (optionally after holding) with the best score after searching
+    depth pieces of the next queue, only the beam best candidates of each level are expanded
+    """
+
+    # pylint: disable=too-many-positional-arguments
+    def __init__(self, weights: Weights = Weights(), depth: int = 2, beam: int = 8,
+                 use_hold: bool = True, cache_size: int = 65536) -> None:
+        self.weights = weights
+        self.depth = depth
+        self.beam = beam
+        self.use_hold = use_hold
+        self.scratch = None
+        self.keys = None
+        self.placements = 0  # Number of placements evaluated
+        # Board scores keyed by Zobrist hash
+        self.evaluations = LRUCache(cache_size)
+        # Search results keyed by (Zobrist hash, queue, depth)
+        self.transpositions = LRUCache(cache_size)
+
+    def evaluate(self, rows: tuple[int, ...], zobrist: int) -> float:
+        """Scores a board, boards that were already scored are looked up by their hash"""
+        score = self.evaluations.get(zobrist)
+        if score is None:
+            score = evaluate(rows, self.scratch.width, self.weights)
+            self.evaluations.put(zobrist, score)
+        return score
+
+    def board(self, grid: Grid) -> tuple[int, ...]:
+        """Returns the grid as row bitmasks"""
+        if isinstance(grid, BitGrid):
+            return tuple(grid.rows)
+        return tuple(sum(1 << x for x, cell in enumerate(row) if cell) for row in grid.cells)
+
+    def search(self, rows: tuple[int, ...], zobrist: int, queue: list[PType], depth: int,
+               start: tuple[int, int, int] = None) -> tuple[float, Placement]:
+        """Returns the best score reachable by placing the pieces of the queue in order
+        and the placement of the first piece that leads to it, the first piece starts
+        at start (x, y, rotation) and every later piece at the spawn position
+        """
+        depth = min(depth, len(queue))
+        key = (zobrist, tuple(queue[:depth]), depth, start)
+        best = self.transpositions.get(key)
+        if best is not None:
+            return best
+        scratch = self.scratch
+        scratch.rows = rows
+        candidates = []
+        for placement in enumerate_placements(scratch, queue[0], *(start or ())):
+            new_rows, new_zobrist, cleared = place(rows, zobrist, placement,
+                                                   scratch.full_row, self.keys)
+            score = self.weights.lines * cleared + self.evaluate(new_rows, new_zobrist)
+            candidates.append((score, cleared, new_rows, new_zobrist, placement))
+        self.placements += len(candidates)
+        if not candidates:
+            best = (float("-inf"), None)
+        elif depth <= 1:
+            best = max(candidates, key=lambda candidate: candidate[0])
+            best = (best[0], best[4])
+        else:
+            candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+            # The best immediate placement, kept if every line tops out with a later piece
+            best = (float("-inf"), candidates[0][4])
+            for _score, cleared, new_rows, new_zobrist, placement in candidates[:self.beam]:
+                score = self.search(new_rows, new_zobrist, queue[1:], depth - 1)[0]
+                score += self.weights.lines * cleared
+                if score > best[0]:
+                    best = (score, placement)
+        self.transpositions.put(key, best)
+        return best
+
+    def plan(self, game: Game) -> tuple[bool, Placement]:
+        """Returns whether to hold first and the placement to make with the resulting piece"""
+        grid = game.grid
+        if self.scratch is None or (self.scratch.width, self.scratch.height) != \
+                (grid.width, grid.height):
+            self.scratch = BitGrid(grid.width, grid.height)
+            self.keys = zobrist_keys(grid.width, grid.height)
+            # Hashes are only comparable between grids of the same size
+            self.evaluations.clear()
+            self.transpositions.clear()
+        rows = self.board(grid)
+        preview = game.randomizer.peek(self.depth)
+        piece = game.active_piece
+        queue = [piece.type] + preview
+        score, placement = self.search(rows, grid.zobrist, queue, self.depth,
+                                       (piece.x, piece.y, piece.rotation))
+        if self.use_hold and not game.swapped_hold:
+            if game.hold_piece:
+                hold_queue = [game.hold_piece] + preview
+            else:
+                hold_queue = preview
+            if hold_queue and hold_queue[0] != queue[0]:
+                hold_score, hold_placement = self.search(rows, grid.zobrist, hold_queue,
+                                                         self.depth)
+                if hold_score > score:
+                    return True, hold_placement
+        return False, placement
+
+    def play(self, game: Game) -> bool:
+        """Plans and makes a move with the active piece, which is locked by a hard drop,
+        returns False if there is nothing to place
+        """
+        if game.active_piece is None:
+            return False
+        hold, placement = self.plan(game)
+        if placement is None:
+            return False
+        if hold:
+            game.act(Action.HOLD)
+            if game.active_piece is None:
+                return False  # Topped out
+        piece = game.active_piece
+        path = find_path(game.grid, piece.type, (piece.x, piece.y, piece.rotation), placement)
+        if path is None:
+            path = [Action.HARD_DROP]  # Should not happen as placements are searched from here
+        for action in path:
+            game.act(action)
+        return True
+
+
+def main() -> None:
+    """Command line entry point, plays a headless game and prints how fast the bot played"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pieces", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--beam", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--randomizer", choices=GENERATORS, default="7bag")
+    args = parser.parse_args()
+
+    engine = Engine(BitGrid(10, 20), args.seed, GENERATORS[args.randomizer]())
+    bot = Bot(depth=args.depth, beam=args.beam)
+    game = engine.game
+    start = time.perf_counter()
+    for _piece in range(args.pieces):
+        if game.active_piece is None and not game.spawn():
+            print("Topped out")
+            break
+        bot.play(game)
+    elapsed = time.perf_counter() - start
+    print(f'Pieces: {game.pieces}, lines: {game.lines} in {elapsed:.2f}s '
+          f'({game.pieces / elapsed:.0f} pieces/s, {bot.placements / elapsed:.0f} placements/s)')
+    print(f'Evaluation cache: {bot.evaluations}')
+    print(f'Transposition cache: {bot.transpositions}')
+
+
+if __name__ == "__main__":
+    main()
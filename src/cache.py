@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Size bounded mapping that evicts the least recently used entry when full,
+    counts hits, misses and evictions so it can be sized
+    """
+
+    def __init__(self, maxsize: int = 65536) -> None:
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Returns the value of key (marking it as recently used) or default if missing"""
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """Stores the value of key, evicting the least recently used entry if full"""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self) -> float:
+        """Returns the fraction of lookups that were hits"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        """Removes every entry, the counters are kept"""
+        self.data.clear()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __str__(self) -> str:
+        return (f'size={len(self.data)}/{self.maxsize} hits={self.hits} misses={self.misses} '
+                f'hit rate={self.hit_rate():.1%} evictions={self.evictions}')
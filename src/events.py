@@ -0,0 +1,139 @@
+"""Events emitted by Game and the bus that delivers them to subscribers."""
+from collections import deque
+from typing import Callable, NamedTuple
+
+from piece import Piece, PType
+
+
+class PieceState(NamedTuple):
+    """Immutable copy of the type and position of a piece, events never reference
+    the game's Piece objects as they keep changing after the event was emitted
+    """
+    type: PType
+    x: int
+    y: int
+    rotation: int
+
+    @classmethod
+    def of(cls, piece: Piece) -> "PieceState":
+        """Returns the current state of the piece"""
+        return cls(piece.type, piece.x, piece.y, piece.rotation)
+
+
+class PieceSpawned(NamedTuple):
+    """A new active piece entered the board"""
+    piece: PieceState
+
+
+class PieceMoved(NamedTuple):
+    """The active piece moved sideways or down, by an input or by gravity"""
+    piece: PieceState
+
+
+class PieceRotated(NamedTuple):
+    """The active piece rotated, its position includes any wall kick"""
+    piece: PieceState
+
+
+class PieceLocked(NamedTuple):
+    """The active piece was added to the grid at cells"""
+    piece: PieceState
+    cells: tuple[tuple[int, int], ...]
+
+
+class LinesCleared(NamedTuple):
+    """Full rows were removed, row_map is the new y of every old row (None if cleared)"""
+    count: int
+    row_map: tuple[int, ...]
+
+
+class PieceHeld(NamedTuple):
+    """The active piece (old_piece) was swapped into the hold slot for piece,
+    which starts at the spawn position
+    """
+    old_piece: PieceState
+    hold_type: PType
+    piece: PieceState
+
+
+class NextChanged(NamedTuple):
+    """The preview changed, pieces are the next pieces in order"""
+    pieces: tuple[PType, ...]
+
+
+class GameReset(NamedTuple):
+    """The board was cleared, top_out is True if it was caused by topping out"""
+    top_out: bool
+
+
+# Only the latest of each of these matters to anything that draws the current state
+COALESCED = (PieceMoved, PieceRotated, NextChanged)
+# Events that start or end the life of an active piece, nothing is coalesced across them
+LIFECYCLE = (PieceSpawned, PieceLocked, PieceHeld, GameReset)
+
+
+class EventQueue:
+    """Buffers events for a subscriber that consumes them later, e.g. once per frame"""
+
+    def __init__(self, maxlen: int = None) -> None:
+        self.events = deque(maxlen=maxlen)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def put(self, event) -> None:
+        """Adds an event, used as the subscriber of the bus"""
+        self.events.append(event)
+
+    def drain(self, coalesce: bool = False) -> list:
+        """Removes and returns every buffered event in order, if coalesce is True
+        the COALESCED events that are followed by an event of the same type before
+        the next LIFECYCLE event are dropped, so a piece that spawned and locked
+        since the last drain still has its spawn, last move and lock
+        """
+        events = list(self.events)
+        self.events.clear()
+        if not coalesce:
+            return events
+        seen = set()  # Types of the COALESCED events kept since the next LIFECYCLE event
+        kept = []
+        for event in reversed(events):
+            if isinstance(event, LIFECYCLE):
+                seen.clear()
+            elif isinstance(event, COALESCED):
+                if type(event) in seen:
+                    continue
+                seen.add(type(event))
+            kept.append(event)
+        kept.reverse()
+        return kept
+
+
+class EventBus:
+    """Delivers every emitted event to the subscribers of its type, synchronously
+    in the order they subscribed, see queue for subscribers that consume them later
+    """
+
+    def __init__(self) -> None:
+        self.handlers = []  # (event types, handler), no types means every event
+
+    def subscribe(self, handler: Callable, *types: type) -> Callable:
+        """Calls handler with every event of the given types (all if none are given)"""
+        self.handlers.append((types, handler))
+        return handler
+
+    def unsubscribe(self, handler: Callable) -> None:
+        """Removes every subscription of handler"""
+        self.handlers = [entry for entry in self.handlers if entry[1] != handler]
+
+    def queue(self, *types: type, maxlen: int = None) -> EventQueue:
+        """Returns a new queue that receives every event of the given types (all if none)"""
+        queue = EventQueue(maxlen)
+        self.subscribe(queue.put, *types)
+        return queue
+
+    def emit(self, event) -> None:
+        """Delivers the event to its subscribers"""
+        for types, handler in self.handlers:
+            if not types or isinstance(event, types):
+                handler(event)
@@ -1,153 +1,294 @@
 import random
+from enum import Enum, auto
+from typing import NamedTuple
 
+from basestyle import Style
+from events import (EventBus, GameReset, LinesCleared, NextChanged, PieceHeld, PieceLocked,
+                    PieceMoved, PieceRotated, PieceSpawned, PieceState)
 from grid import Grid
 from piece import Piece, PType
-from style import Style
+from randomizer import PieceGenerator, Randomizer
+
+
+class Action(Enum):
+    """Represents the inputs that can be applied to the active piece,
+    PAUSE and RESET are only handled by Game.input
+    """
+    LEFT = auto()
+    RIGHT = auto()
+    SOFT_DROP = auto()
+    HARD_DROP = auto()
+    ROTATE_CW = auto()
+    ROTATE_CCW = auto()
+    HOLD = auto()
+    PAUSE = auto()
+    RESET = auto()
+
+
+KEYS = {
+    "left": Action.LEFT,
+    "right": Action.RIGHT,
+    "up": Action.HARD_DROP,
+    "down": Action.SOFT_DROP,
+    "x": Action.ROTATE_CW,
+    "z": Action.ROTATE_CCW,
+    "shift_l": Action.HOLD,
+    "space": Action.PAUSE,
+    "r": Action.RESET,
+}
+
+
+class GameState(NamedTuple):
+    """Immutable copy of everything needed to restore a Game, see Game.snapshot"""
+    cells: tuple
+    piece: tuple  # (type, x, y, rotation) of the active piece or None
+    hold_piece: PType
+    swapped_hold: bool
+    queue: tuple  # See Randomizer.snapshot
+    random: tuple
+    counters: tuple  # frame, ticks, fail_ticks, score, lines, pieces, top_outs
+    pause: bool
 
 
 class Game:
     """Primary Game State Instance
-    Responsible for handling game controls and logic
+    Responsible for handling game controls and logic, everything that happens is emitted
+    on events (see events.py), the style buffers them and draws them once per frame, in render
     """
 
-    def __init__(self, style: Style, grid: Grid) -> None:
+    gravity = 10  # Ticks between each gravity step
+    preview = 4  # Number of next pieces shown
+
+    def __init__(self, style: Style, grid: Grid, seed=None,
+                 generator: PieceGenerator = None) -> None:
         self.style = style
         self.grid = grid
+        self.events = EventBus()
+        style.attach(self.events)
+        # A seed is always picked so that every game can be replayed
+        self.seed = seed if seed is not None else random.randrange(2 ** 63)
+        self.random = random.Random(self.seed)
+        self.randomizer = Randomizer(self.random, generator)
+        self.frame = 0  # Number of tick calls, unlike ticks this is never reset
+        self.recorder = None
         self.reset()
         self.pause = False
-        self.bag = []
         self.fail_ticks = 0
         self.active_piece = None
         self.hold_piece = None
         self.swapped_hold = False
+        self.top_outs = 0
 
     def tick(self) -> None:
         """Ticks the game state, called every frame"""
+        self.frame += 1
         self.ticks += 1
-        if self.ticks % 10 != 0 or self.pause:
+        if self.ticks % self.gravity != 0 or self.pause:
             return
+        self.fall()
+
+    def fall(self) -> None:
+        """Advances gravity by one step, spawning a new piece if there is none
+        and locking the active piece if it has failed to fall for too long
+        """
         if self.active_piece is None:
-            self.active_piece = self.generate_piece()
-            self.swapped_hold = False
-            if not self.grid.try_fit(self.active_piece):
-                self.reset()
+            self.spawn()
             return
         self.active_piece.y += 1
         if not self.grid.try_fit(self.active_piece):
             self.active_piece.y -= 1
             self.fail_ticks += 1
             if self.fail_ticks > 3:
-                self.active_piece.blocks = self.style.draw_piece(
-                    self.active_piece)
-                self.grid.add_piece(self.active_piece)
-                self.check_clear()
-                self.active_piece = None
-                self.fail_ticks = 0
+                self.lock_piece()
         else:
             self.fail_ticks = 0
+            self.events.emit(PieceMoved(PieceState.of(self.active_piece)))
+
+    def spawn(self) -> bool:
+        """Spawns the next piece, resetting the game if it does not fit (top out)
+        returns whether the piece fit
+        """
+        self.active_piece = self.generate_piece()
+        self.swapped_hold = False
+        if not self.grid.try_fit(self.active_piece):
+            self.top_out()
+            return False
+        self.events.emit(PieceSpawned(PieceState.of(self.active_piece)))
+        return True
 
-        for y in range(self.grid.height):
-            for x in range(self.grid.width):
-                block = self.grid.blocks[y][x]
-                if not block:
-                    continue
-                if block.x != x or block.y != y:
-                    print(f'Block at {block.x}, {block.y} is not at {x}, {y}')
+    def top_out(self) -> None:
+        """Counts a top out and resets the board"""
+        self.top_outs += 1
+        self.reset(True)
+
+    def lock_piece(self) -> None:
+        """Locks the active piece into the grid and clears any filled lines"""
+        piece = self.active_piece
+        self.grid.add_piece(piece)
+        self.pieces += 1
+        self.events.emit(PieceLocked(PieceState.of(piece), tuple(
+            (piece.x + x, piece.y + y) for x, y in piece.get_coords())))
+        self.check_clear()
+        self.active_piece = None
+        self.fail_ticks = 0
 
     def check_clear(self) -> None:
-        """Calls both grid and style clear lines which handles clearing lines"""
-        self.grid.clear_lines()
-        self.style.clear_lines()
+        """Clears full lines from the grid and emits LinesCleared if there were any"""
+        cleared = self.grid.clear_lines()
+        if cleared:
+            self.lines += cleared
+            self.events.emit(LinesCleared(cleared, tuple(self.grid.row_map)))
 
-    def reset(self) -> None:
+    def reset(self, top_out: bool = False) -> None:
         """Resets the game board, primarily meant for when the player tops out"""
         self.grid.clear()
-        self.style.clear_board()
         self.active_piece = None
         self.ticks = 0
         self.fail_ticks = 0
         self.score = 0
+        self.lines = 0
+        self.pieces = 0
         self.alive = True
-        self.style.draw_boundaries()
+        self.events.emit(GameReset(top_out))
+
+    def snapshot(self) -> GameState:
+        """Returns an immutable copy of the game state, does not include anything drawn"""
+        piece = self.active_piece
+        return GameState(
+            self.grid.snapshot(),
+            (piece.type, piece.x, piece.y, piece.rotation) if piece else None,
+            self.hold_piece,
+            self.swapped_hold,
+            self.randomizer.snapshot(),
+            self.random.getstate(),
+            (self.frame, self.ticks, self.fail_ticks, self.score,
+             self.lines, self.pieces, self.top_outs),
+            self.pause,
+        )
+
+    def restore(self, state: GameState) -> None:
+        """Restores a snapshot taken with snapshot, no events are emitted so the style
+        is not redrawn, see Style.draw_board
+        """
+        self.grid.restore(state.cells)
+        self.active_piece = None
+        if state.piece:
+            ptype, x, y, rotation = state.piece
+            self.active_piece = Piece(x, None, ptype)
+            self.active_piece.y = y
+            self.active_piece.set_rotate(rotation)
+        self.hold_piece = state.hold_piece
+        self.swapped_hold = state.swapped_hold
+        self.randomizer.restore(state.queue)
+        self.random.setstate(state.random)
+        (self.frame, self.ticks, self.fail_ticks, self.score,
+         self.lines, self.pieces, self.top_outs) = state.counters
+        self.pause = state.pause
 
     def render(self) -> None:
-        """Renders the game state to the screen"""
-        if self.active_piece:
-            self.active_piece.blocks = self.style.draw_piece(
-                self.active_piece, True)
+        """Renders the game state to the screen, the style draws every event
+        emitted since the last frame
+        """
+        self.style.render()
 
     def generate_piece(self) -> Piece:
-        """Generates the next piece to be used using the 7-bag system"""
+        """Generates the next piece to be used from the randomizer"""
         ptype = self.get_next_piece()
-        self.style.draw_next(self.bag)
-        return Piece(self.grid.width // 2 - 1, self.style, ptype)
+        return Piece(self.grid.width // 2 - 1, None, ptype)
 
     def get_next_piece(self) -> PType:
-        """Gets the next PType to be used, does NOT generate a new Piece"""
-        if len(self.bag) == 0:
-            self.bag = list(PType)
-            random.shuffle(self.bag)
-        to_make = list(PType)
-        for piece in self.bag:
-            if piece in to_make:
-                to_make.remove(piece)
-
-        self.bag.insert(
-            0, to_make[0] if len(to_make) > 0 else random.choice(list(PType))
-        )
-        return self.bag.pop()
+        """Gets the next PType to be used and emits the new preview, does NOT create a Piece"""
+        ptype = self.randomizer.draw()
+        self.events.emit(NextChanged(tuple(self.randomizer.peek(self.preview))))
+        return ptype
 
     def on_key(self, event) -> None:
         """Input handler for the game"""
         if self.active_piece is None:
             return
-        if event.keysym.lower() == "space":
+        key = event.keysym.lower()
+        if key not in KEYS:
+            print("Unknown key:", key)
+            return
+        self.input(KEYS[key])
+
+    def input(self, action: Action) -> None:
+        """Handles an input from the player, passing it to the recorder if there is one"""
+        if self.active_piece is None:
+            return
+        if self.recorder:
+            self.recorder.record(self.frame, action)
+        if action == Action.PAUSE:
             self.pause = not self.pause
             return
         if self.pause:
             return
+        if action == Action.RESET:
+            self.reset()
+            return
+        self.act(action)
+
+    def act(self, action: Action) -> None:
+        """Applies the given action to the active piece"""
+        if self.active_piece is None:
+            return
         last_coord = (self.active_piece.x, self.active_piece.y)
-        last_rotate = self.active_piece.rotation
-        target_rotation = last_rotate
-        match event.keysym.lower():
-            case "left":
+        target_rotation = self.active_piece.rotation
+        match action:
+            case Action.LEFT:
                 self.active_piece.x -= 1
-            case "right":
+            case Action.RIGHT:
                 self.active_piece.x += 1
-            case "up":  # Hard drop
-                while self.grid.try_fit(self.active_piece):
-                    self.active_piece.y += 1
-                self.active_piece.y -= 1
-                self.active_piece.blocks = self.style.draw_piece(
-                    self.active_piece)
-                self.grid.add_piece(self.active_piece)
-                self.check_clear()
-                self.active_piece = None
+            case Action.HARD_DROP:
+                self.active_piece.y += self.grid.drop_distance(
+                    self.active_piece.type, self.active_piece.rotation,
+                    self.active_piece.x, self.active_piece.y)
+                self.lock_piece()
                 return
-            case "down":  # Soft drop
+            case Action.SOFT_DROP:
                 self.active_piece.y += 1
-            case "z":
+            case Action.ROTATE_CCW:
                 target_rotation = (self.active_piece.rotation + 3) % 4
-            case "x":
+            case Action.ROTATE_CW:
                 target_rotation = (self.active_piece.rotation + 1) % 4
-            case "shift_l":
-                if self.swapped_hold:
-                    return
-                self.swapped_hold = True
-                new_type = self.get_next_piece() if not self.hold_piece else self.hold_piece
-                new_piece = Piece(self.grid.width // 2 -
-                                  1, self.style, new_type)
-                self.hold_piece = self.active_piece.type
-                self.style.draw_hold(self.active_piece, self.hold_piece)
-                self.active_piece = new_piece
-            case "r":
-                self.reset()
+            case Action.HOLD:
+                self.hold()
                 return
-            case _:
-                print("Unknown key:", event.keysym.lower())
-        if not self.grid.try_fit(self.active_piece, target_rotation):
+        position = self.grid.kick(self.active_piece.type, self.active_piece.x,
+                                  self.active_piece.y, self.active_piece.rotation,
+                                  target_rotation)
+        if position is None:
             # Piece did not fit, revert to last position
             self.active_piece.x, self.active_piece.y = last_coord
         else:
-            # Piece successfully fit, update rotation if needed
-            self.active_piece.set_rotate(target_rotation)
+            self.move_active(position, target_rotation, last_coord)
+
+    def hold(self) -> None:
+        """Swaps the active piece with the held piece (the next piece if nothing is held),
+        the swapped in piece spawns like a new piece so it tops out if it does not fit
+        """
+        if self.swapped_hold:
+            return
+        self.swapped_hold = True
+        new_type = self.get_next_piece() if not self.hold_piece else self.hold_piece
+        new_piece = Piece(self.grid.width // 2 - 1, None, new_type)
+        self.hold_piece = self.active_piece.type
+        if not self.grid.fits(new_piece.type, new_piece.rotation, new_piece.x, new_piece.y):
+            self.top_out()
+            return
+        self.events.emit(PieceHeld(PieceState.of(self.active_piece), self.hold_piece,
+                                   PieceState.of(new_piece)))
+        self.active_piece = new_piece
+
+    def move_active(self, position: tuple[int, int], rotation: int,
+                    last_coord: tuple[int, int]) -> None:
+        """Moves the active piece to the (kicked) position and rotation that fit
+        and emits the move or rotation if anything changed
+        """
+        piece = self.active_piece
+        piece.x, piece.y = position
+        if rotation != piece.rotation:
+            piece.set_rotate(rotation)
+            self.events.emit(PieceRotated(PieceState.of(piece)))
+        elif position != last_coord:
+            self.events.emit(PieceMoved(PieceState.of(piece)))
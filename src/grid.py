@@ -1,9 +1,10 @@
-from piece import Piece, PType, generate_coords
+from piece import SHAPES, Piece, PType, Shape
+from zobrist import hash_cells, zobrist_keys
 
 
 class Grid:
-    """Internal boolean represntation of the game board where
-      filled blocks are True and empty blocks are False
+    """Internal represntation of the game board, each row is a bytearray holding
+      the PType value of the piece that filled each cell, or 0 if it is empty
     """
     basicWallKick = [
         [(-1, 0), (-1, 1), (0, -2), (-1, -2)],  # 0>>1
@@ -30,59 +31,88 @@ class Grid:
     def __init__(self, width: int, height: int) -> None:
         self.width = width
         self.height = height
-        self.grid = [[False for y in range(width)] for x in range(height)]
-        self.blocks = [[None for y in range(width)] for x in range(height)]
-        self.to_delete = []
+        self.cells = [bytearray(width) for y in range(height)]
+        self.row_map = None
+        self.keys = zobrist_keys(width, height)
+        self.zobrist = 0  # Zobrist hash of the filled cells, see zobrist.py
+        # y of the highest filled cell of every column (height if empty), see drop_distance
+        self.tops = [height] * width
 
     def get_grid(self) -> list[list[bool]]:
-        """Returns the grid"""
-        return self.grid
+        """Returns the grid where filled blocks are True and empty blocks are False"""
+        return [[cell != 0 for cell in row] for row in self.cells]
 
     def is_block(self, x: int, y: int) -> bool:
         """Returns true if the given position has a block"""
-        return self.grid[y][x]
+        return self.cells[y][x] != 0
+
+    def get_type(self, x: int, y: int) -> PType:
+        """Returns the type of the piece that filled the given position, or None if empty"""
+        code = self.cells[y][x]
+        return PType(code) if code else None
 
     def try_fit(self, piece: Piece, rotation=None) -> bool:
         """Returns whether the piece can fit in the grid, if rotation is specified,
-          it will use the hitbox from the given rotation, though will not rotate the piece itself
+          it will use the hitbox from the given rotation (including wall kicks),
+          the piece itself is never moved or rotated, see kick
         """
-        fits = True
-        coords = generate_coords(
-            piece.type, rotation if rotation is not None else piece.rotation
-        )
-        for x, y in coords:
-            if piece.x + x < 0 or piece.x + x >= self.width:
-                fits = False
-                break
-            if piece.y + y < 0 or piece.y + y >= self.height:
-                fits = False
-                break
-            if self.is_block(piece.x + x, piece.y + y):
-                fits = False
-                break
-        if fits:
-            return True
         if rotation is None or rotation == piece.rotation:
+            return self.fits(piece.type, piece.rotation, piece.x, piece.y)
+        return self.kick(piece.type, piece.x, piece.y, piece.rotation, rotation) is not None
+
+    # pylint: disable=too-many-positional-arguments
+    def kick(self, ptype: PType, x: int, y: int, old_rot: int, new_rot: int) -> tuple[int, int]:
+        """Returns the position a piece at x, y ends up at after rotating from old_rot to new_rot
+        using the SRS wall kicks, or None if it does not fit, does not modify any state
+        """
+        shape = SHAPES[ptype][new_rot % 4]
+        for test_x, test_y in KICKS[ptype][old_rot % 4][new_rot % 4]:
+            if self.shape_fits(shape, x + test_x, y + test_y):
+                return x + test_x, y + test_y
+        return None
+
+    def drop_distance(self, ptype: PType, rotation: int, x: int, y: int) -> int:
+        """Returns how many rows a piece that fits at x, y can fall, checked against the
+        column tops using the bottom of each column of the piece, a piece that is below
+        the top of a column (tucked under an overhang) falls back to testing every row
+        """
+        shape = SHAPES[ptype][rotation % 4]
+        distance = self.height
+        for cx, cy in shape.bottoms:
+            gap = self.tops[x + cx] - (y + cy) - 1
+            if gap < 0:
+                break
+            distance = min(distance, gap)
+        else:
+            return distance
+        distance = 0
+        while self.shape_fits(shape, x, y + distance + 1):
+            distance += 1
+        return distance
+
+    def fits(self, ptype: PType, rotation: int, x: int, y: int) -> bool:
+        """Returns whether a piece of the given type and rotation fits at x, y
+        without going out of bounds or overlapping any existing blocks
+        """
+        return self.shape_fits(SHAPES[ptype][rotation % 4], x, y)
+
+    def shape_fits(self, shape: Shape, x: int, y: int) -> bool:
+        """Same as fits but takes the Shape directly, used to avoid repeated SHAPES lookups"""
+        if not self.in_bounds(shape, x, y):
             return False
+        for cx, cy in shape.coords:
+            if self.cells[y + cy][x + cx]:
+                return False
+        return True
+
+    def in_bounds(self, shape: Shape, x: int, y: int) -> bool:
+        """Returns whether the bounding box of the shape at x, y is inside the grid"""
+        min_x, min_y, max_x, max_y = shape.bounds
+        return (0 <= x + min_x and x + max_x < self.width
+                and 0 <= y + min_y and y + max_y < self.height)
 
-        test_index = self.get_test_index(piece.rotation, rotation)
-        #pylint: disable=invalid-sequence-index
-        tests = (self.basicWallKick[test_index] if piece.type !=
-                 PType.I else self.iWallKick[test_index])
-
-        o_pos = (piece.x, piece.y)
-        o_rot = piece.rotation
-        for test_x, test_y in tests:
-            piece.x += test_x
-            piece.y -= test_y
-            piece.set_rotate(rotation)
-            if self.try_fit(piece, rotation):
-                return True
-            piece.x, piece.y = o_pos
-            piece.set_rotate(o_rot)
-        return False
-
-    def get_test_index(self, old_rot: int, new_rot: int) -> int:
+    @staticmethod
+    def get_test_index(old_rot: int, new_rot: int) -> int:
         """Returns the index of the wall kick tests to use"""
         match old_rot:
             case 0:
@@ -97,33 +127,90 @@ class Grid:
     def add_piece(self, piece: Piece) -> None:
         """Adds the piece to the grid"""
         for x, y in piece.get_coords():
-            self.grid[piece.y + y][piece.x + x] = True
-            self.blocks[piece.y + y][piece.x + x] = piece.get_block(
-                piece.x + x, piece.y + y
-            )
+            self.cells[piece.y + y][piece.x + x] = piece.type.value
+            self.zobrist ^= self.keys[piece.y + y][piece.x + x]
+            self.tops[piece.x + x] = min(self.tops[piece.x + x], piece.y + y)
 
     def clear_lines(self) -> int:
-        """Clears all lines that are full and returns the number of lines cleared"""
-        cleared = 0
+        """Clears all lines that are full and returns the number of lines cleared,
+        the remaining rows are shifted down in a single pass and row_map is set to
+        the new y of every old row (None for cleared rows)
+        """
+        kept = [y for y in range(self.height) if not self.is_full(y)]
+        cleared = self.height - len(kept)
+        if cleared == 0:
+            return 0
+        self.row_map = [None] * self.height
+        for y, old_y in enumerate(kept, cleared):
+            self.row_map[old_y] = y
         for y in range(self.height):
-            if not all(self.grid[y]):
-                continue
-            cleared += 1
-            self.grid.pop(y)
-            self.grid.insert(0, [False for x in range(self.width)])
-            self.to_delete += self.blocks.pop(y)
-            self.blocks.insert(0, [None for x in range(self.width)])
-
-            for yy in range(y + 1):
-                for block in self.blocks[yy]:
-                    if block:
-                        block.y += 1
-            y -= 1
+            if self.row_map[y] != y:
+                self.move_hash(y, self.row_map[y])
+
+        self.compact(kept, cleared)
+        self.update_tops()
         return cleared
 
+    def update_tops(self) -> None:
+        """Lowers the column tops to the highest filled cell at or below them,
+        used after rows were cleared as rows only ever move down
+        """
+        for x, top in enumerate(self.tops):
+            while top < self.height and not self.cells[top][x]:
+                top += 1
+            self.tops[x] = top
+
+    def move_hash(self, old_y: int, new_y: int) -> None:
+        """Updates the Zobrist hash for the row at old_y moving to new_y (None if cleared)"""
+        old_keys = self.keys[old_y]
+        new_keys = self.keys[new_y] if new_y is not None else None
+        for x, cell in enumerate(self.cells[old_y]):
+            if cell:
+                self.zobrist ^= (old_keys[x] ^ new_keys[x]) if new_keys else old_keys[x]
+
+    def is_full(self, y: int) -> bool:
+        """Returns true if every cell of the row is filled"""
+        return all(self.cells[y])
+
+    def compact(self, kept: list[int], cleared: int) -> None:
+        """Replaces the rows with the kept rows (in order) below cleared empty rows"""
+        self.cells = [bytearray(self.width) for y in range(cleared)] + [self.cells[y] for y in kept]
+
+    def snapshot(self) -> tuple[bytes, ...]:
+        """Returns an immutable copy of the cells, see restore"""
+        return tuple(bytes(row) for row in self.cells)
+
+    def restore(self, cells: tuple[bytes, ...]) -> None:
+        """Restores the cells returned by snapshot"""
+        self.cells = [bytearray(row) for row in cells]
+        self.row_map = None
+        self.zobrist = hash_cells(self.cells, self.keys)
+        self.tops = [0] * self.width
+        self.update_tops()
+
     def clear(self) -> None:
         """Clears the grid, meant for when the user tops out"""
-        self.grid = [[False for y in range(self.width)]
-                     for x in range(self.height)]
-        self.blocks = [[None for y in range(self.width)]
-                       for x in range(self.height)]
+        self.cells = [bytearray(self.width) for y in range(self.height)]
+        self.row_map = None
+        self.zobrist = 0
+        self.tops = [self.height] * self.width
+
+
+def build_kicks() -> dict[PType, tuple[tuple[tuple[tuple[int, int], ...], ...], ...]]:
+    """Builds the kick offsets of every piece type indexed by [ptype][old_rot][new_rot],
+    offsets are in grid coordinates (y pointing down) and start with the unkicked (0, 0)
+    """
+    kicks = {}
+    for ptype in PType:
+        table = Grid.iWallKick if ptype == PType.I else Grid.basicWallKick
+        kicks[ptype] = tuple(
+            tuple(
+                ((0, 0),) if old_rot == new_rot else ((0, 0),) + tuple(
+                    (test_x, -test_y)
+                    for test_x, test_y in table[Grid.get_test_index(old_rot, new_rot)])
+                for new_rot in range(4))
+            for old_rot in range(4))
+    return kicks
+
+
+KICKS = build_kicks()
@@ -0,0 +1,53 @@
+import copy
+from typing import NamedTuple
+
+from basestyle import NullStyle
+from game import Action, Game
+from grid import Grid
+from randomizer import PieceGenerator
+
+
+class StepResult(NamedTuple):
+    """Events that happened during a single Engine step"""
+    locked: bool
+    cleared: int
+    topped_out: bool
+
+
+class Engine:
+    """Headless game engine that runs a Game without a display,
+    each step applies an action and then advances gravity once
+    """
+
+    def __init__(self, grid: Grid = None, seed=None, generator: PieceGenerator = None) -> None:
+        self.grid = grid if grid is not None else Grid(10, 20)
+        self.game = Game(NullStyle(self.grid), self.grid, seed, generator)
+
+    def step(self, action: Action = None) -> StepResult:
+        """Applies the action (if any) to the active piece, then advances gravity,
+        a new piece is spawned first if the last one was locked, a top out (at spawn
+        or when holding) ends the step
+        """
+        game = self.game
+        if game.active_piece is None and not game.spawn():
+            return StepResult(False, 0, True)
+        pieces, lines, top_outs = game.pieces, game.lines, game.top_outs
+        if action is not None:
+            game.act(action)
+        if game.top_outs != top_outs:
+            return StepResult(False, 0, True)
+        if game.active_piece is not None:
+            game.ticks += game.gravity
+            game.fall()
+        return StepResult(game.pieces != pieces, game.lines - lines, False)
+
+    def fork(self) -> "Engine":
+        """Returns a new engine with a copy of this engine's game state"""
+        engine = Engine(type(self.grid)(self.grid.width, self.grid.height), self.game.seed,
+                        copy.copy(self.game.randomizer.generator))
+        engine.game.restore(self.game.snapshot())
+        return engine
+
+    def reset(self) -> None:
+        """Resets the game to an empty board"""
+        self.game.reset()
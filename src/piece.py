@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import NamedTuple
 
 
 class PType(Enum):
@@ -17,31 +18,22 @@ class Piece:
       (drawn) blocks, rotation, position, and coordinates
       """
 
+    __slots__ = ("type", "rotation", "grid", "x", "y", "blocks")
+
     def __init__(self, x: int, style, ptype: PType) -> None:
+        """style may be None to create the piece without drawing it"""
         self.type = ptype
         self.rotation = 0
         self.grid = generate_piece(ptype, self.rotation)
         self.x = x
         self.y = 0
         self.blocks = []
-        self.blocks = style.draw_piece(self)
+        if style is not None:
+            self.blocks = style.draw_piece(self)
 
-    def get_coords(self) -> list[tuple[int, int]]:
+    def get_coords(self) -> tuple[tuple[int, int], ...]:
         """Gets the coordinates that needed to draw at, see generateCoords"""
-        coords = []
-        for i in range(4):
-            #pylint: disable=unsubscriptable-object
-            coords.append((self.grid[0][i], self.grid[1][i]))
-        return coords
-
-    def get_block(self, x, y):
-        """Get the (drawn) block at the specific GLOBAL coordinates
-        throws an exception if no block belonging to the piece exists
-        """
-        for block in self.blocks:
-            if block.x == x and block.y == y:
-                return block
-        raise Exception(f'Block not found at {x}, {y}')
+        return SHAPES[self.type][self.rotation].coords
 
     def rotate(self, counter=True) -> None:
         """Rotates the piece either clockwise or counter-clockwise
@@ -62,28 +54,61 @@ class Piece:
 
 
 class Block:
-    """Data wrapper for a drawn block, holding the parent piece, x, y, and an arbitrary ID"""
+    """Data wrapper for a drawn block, holding the type of its piece, x, y, and an arbitrary ID,
+    blocks do not reference their piece so locked pieces can be freed
+    """
 
-    def __init__(self, piece: Piece, x: int, y: int, uid) -> None:
-        self.piece = piece
+    __slots__ = ("type", "x", "y", "id")
+
+    def __init__(self, ptype: PType, x: int, y: int, uid) -> None:
+        self.type = ptype
         self.x = x
         self.y = y
         self.id = uid
 
 
-def generate_coords(ptype: PType, rot: int = 0) -> list[tuple[int, int]]:
+class Shape(NamedTuple):
+    """Precomputed data of a single piece type and rotation, see SHAPES"""
+    grid: tuple[tuple[int, ...], tuple[int, ...]]
+    coords: tuple[tuple[int, int], ...]
+    # min_x, min_y, max_x, max_y of the coords
+    bounds: tuple[int, int, int, int]
+    # (x, lowest y) of every column the piece occupies
+    bottoms: tuple[tuple[int, int], ...]
+    # (y, bitmask) of every row the piece occupies, bit 0 is the min_x column
+    rows: tuple[tuple[int, int], ...]
+
+
+def generate_coords(ptype: PType, rot: int = 0) -> tuple[tuple[int, int], ...]:
     """Generates the (drawing) coordinates of a piece with the specified type and rotation"""
-    grid = generate_piece(ptype, rot)
-    coords = []
-    for i in range(4):
-        #pylint: disable=unsubscriptable-object
-        coords.append((grid[0][i], grid[1][i]))
-    return coords
+    return SHAPES[ptype][rot % 4].coords
 
 
-# pylint: disable=too-many-return-statements
-def generate_piece(ptype: PType, rot: int = 0) -> tuple[tuple[int], tuple[int]]:
+def generate_piece(ptype: PType, rot: int = 0) -> tuple[tuple[int, ...], tuple[int, ...]]:
     """Generates the relative gamepay coordsintes of a piece with the specified type and rotation"""
+    return SHAPES[ptype][rot % 4].grid
+
+
+def build_shape(ptype: PType, rot: int) -> Shape:
+    """Builds the Shape of a piece with the specified type and rotation"""
+    grid = piece_grid(ptype, rot)
+    coords = tuple(zip(*grid))
+    min_x, max_x = min(grid[0]), max(grid[0])
+    min_y, max_y = min(grid[1]), max(grid[1])
+    bottoms = {}
+    rows = {}
+    for x, y in coords:
+        bottoms[x] = max(bottoms.get(x, y), y)
+        rows[y] = rows.get(y, 0) | 1 << (x - min_x)
+    return Shape(grid, coords, (min_x, min_y, max_x, max_y),
+                 tuple(sorted(bottoms.items())), tuple(sorted(rows.items())))
+
+
+# pylint: disable=too-many-return-statements
+def piece_grid(ptype: PType, rot: int = 0) -> tuple[tuple[int], tuple[int]]:
+    """Calculates the relative gamepay coordsintes of a piece with the specified type and rotation,
+    only used to build SHAPES, use generate_piece instead
+    """
     rot %= 4
     match ptype:
         case PType.I:
@@ -150,3 +175,7 @@ def generate_piece(ptype: PType, rot: int = 0) -> tuple[tuple[int], tuple[int]]:
                     return (0, 0, 1, 1), (1, 2, 0, 1)
     raise Exception(
         f'Could not calculate piece of {ptype} with rotation {rot}')
+
+
+# Every Shape indexed by PType and rotation, built once at import
+SHAPES = {ptype: tuple(build_shape(ptype, rot) for rot in range(4)) for ptype in PType}
@@ -0,0 +1,95 @@
+from collections import deque
+from typing import NamedTuple
+
+from game import Action
+from grid import Grid
+from piece import SHAPES, PType
+
+
+class Placement(NamedTuple):
+    """A position a piece can be locked at, cells are the GLOBAL coordinates it fills"""
+    type: PType
+    x: int
+    y: int
+    rotation: int
+    cells: frozenset[tuple[int, int]]
+
+
+def moves(grid: Grid, ptype: PType, x: int, y: int,
+          rotation: int) -> list[tuple[Action, tuple[int, int, int]]]:
+    """Returns every (action, (x, y, rotation)) the piece can move to in one input,
+    matching Game.act: left, right, soft drop and both rotations with wall kicks
+    """
+    result = []
+    for action, new_x, new_y in ((Action.LEFT, x - 1, y), (Action.RIGHT, x + 1, y),
+                                 (Action.SOFT_DROP, x, y + 1)):
+        if grid.fits(ptype, rotation, new_x, new_y):
+            result.append((action, (new_x, new_y, rotation)))
+    for action, new_rot in ((Action.ROTATE_CW, (rotation + 1) % 4),
+                            (Action.ROTATE_CCW, (rotation + 3) % 4)):
+        kicked = grid.kick(ptype, x, y, rotation, new_rot)
+        if kicked:
+            result.append((action, (*kicked, new_rot)))
+    return result
+
+
+def enumerate_placements(grid: Grid, ptype: PType, x: int = None, y: int = 0,
+                         rotation: int = 0) -> list[Placement]:
+    """Finds every placement reachable from the given position (spawn by default)
+    using left, right, soft drop and both rotations, placements that fill
+    the same cells are only returned once
+    """
+    if x is None:
+        x = grid.width // 2 - 1
+    if not grid.fits(ptype, rotation, x, y):
+        return []
+    shapes = SHAPES[ptype]
+    start = (x, y, rotation)
+    visited = {start}
+    queue = deque([start])
+    placements = []
+    seen_cells = set()
+    while queue:
+        x, y, rotation = queue.popleft()
+        # Same moves as the moves function, inlined as this is the hot path of the bot
+        states = [(x - 1, y, rotation), (x + 1, y, rotation), (x, y + 1, rotation)]
+        for new_rot in ((rotation + 1) % 4, (rotation + 3) % 4):
+            kicked = grid.kick(ptype, x, y, rotation, new_rot)
+            if kicked:
+                states.append((*kicked, new_rot))
+        for state in states:
+            if state not in visited and grid.shape_fits(shapes[state[2]], state[0], state[1]):
+                visited.add(state)
+                queue.append(state)
+
+        if grid.shape_fits(shapes[rotation], x, y + 1):
+            continue
+        cells = frozenset((x + cx, y + cy) for cx, cy in shapes[rotation].coords)
+        if cells not in seen_cells:
+            seen_cells.add(cells)
+            placements.append(Placement(ptype, x, y, rotation, cells))
+    return placements
+
+
+def find_path(grid: Grid, ptype: PType, start: tuple[int, int, int],
+              target: Placement) -> list[Action]:
+    """Returns the shortest list of actions that moves a piece from start (x, y, rotation)
+    to the target placement, ending with a hard drop, or None if it is not reachable
+    """
+    goal = (target.x, target.y, target.rotation)
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        if state == goal:
+            path = [Action.HARD_DROP]
+            while parents[state]:
+                state, action = parents[state]
+                path.append(action)
+            path.reverse()
+            return path
+        for action, new_state in moves(grid, ptype, *state):
+            if new_state not in parents:
+                parents[new_state] = (state, action)
+                queue.append(new_state)
+    return None
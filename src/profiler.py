@@ -0,0 +1,269 @@
+"""Opt-in instrumentation that counts and times calls through the game's subsystems."""
+import cProfile
+import pstats
+import time
+from collections import Counter
+from typing import NamedTuple
+
+from bitgrid import BitGrid
+from game import Game
+from grid import Grid
+from zobrist import hash_row
+
+STYLE_METHODS = ("draw_piece", "draw_ghost", "draw_next", "draw_hold", "draw_boundaries",
+                 "clear_lines", "clear_board", "force_refresh", "relayout")
+
+
+class Sample(NamedTuple):
+    """Number of calls and total seconds spent in an instrumented method"""
+    calls: int
+    seconds: float
+
+    @property
+    def mean(self) -> float:
+        """Mean seconds per call"""
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class Stats(NamedTuple):
+    """Snapshot of every timer and counter of a Profiler"""
+    timers: dict[str, Sample]
+    counters: dict[str, int]
+
+    def __str__(self) -> str:
+        lines = [f'{name}: {sample.calls} calls, {sample.seconds * 1000:.1f}ms total, '
+                 f'{sample.mean * 1e6:.1f}us mean' for name, sample in self.timers.items()]
+        lines += [f'{name}: {count}' for name, count in self.counters.items()]
+        return "\n".join(lines)
+
+
+class Timer:
+    """Mutable accumulator behind a Sample"""
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class GridChecker:
+    """Checks the state a Grid keeps incrementally against its cells, one row at a time:
+    the Zobrist hash (from a hash of every row that is kept up to date with the checked
+    rows), the column tops and the row bitmasks of a BitGrid
+    """
+
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
+        self.row_hashes = []
+        self.rehash()
+
+    def rehash(self) -> None:
+        """Hashes every row, e.g. after the grid was restored or cleared"""
+        grid = self.grid
+        self.row_hashes = [hash_row(row_mask(row), keys)
+                           for row, keys in zip(grid.cells, grid.keys)]
+
+    def check(self, rows) -> list[str]:
+        """Returns a message for every disagreement found in the given rows,
+        which must be every row that changed since the last check
+        """
+        grid = self.grid
+        errors = []
+        for y in rows:
+            mask = row_mask(grid.cells[y])
+            self.row_hashes[y] = hash_row(mask, grid.keys[y])
+            if isinstance(grid, BitGrid) and grid.rows[y] != mask:
+                errors.append(f'Row {y} is {grid.rows[y]:b} but its cells are {mask:b}')
+            for x, top in enumerate(grid.tops):
+                if y < top and grid.cells[y][x]:
+                    errors.append(f'Cell {x}, {y} is filled above the top {top} of its column')
+        for x, top in enumerate(grid.tops):
+            if top < grid.height and not grid.cells[top][x]:
+                errors.append(f'The top {top} of column {x} is empty')
+        zobrist = 0
+        for row_hash in self.row_hashes:
+            zobrist ^= row_hash
+        if zobrist != grid.zobrist:
+            errors.append(f'Hash is {grid.zobrist:x} but the cells hash to {zobrist:x}')
+        return errors
+
+
+def row_mask(row: bytearray) -> int:
+    """Returns the row as a bitmask of its filled cells"""
+    return sum(1 << x for x, cell in enumerate(row) if cell)
+
+
+class Profiler:
+    """Instruments a game by replacing methods of the game, its grid and its style
+    with timed wrappers, nothing is wrapped (so there is no overhead) until enable is called
+    """
+
+    def __init__(self, game: Game, debug: bool = False) -> None:
+        self.game = game
+        # Check the rows changed by every lock and line clear, see check
+        self.debug = debug
+        self.timers = {}
+        self.counters = Counter()
+        self.wrapped = []  # (object, method name) of every installed wrapper
+        self.capture_ticks = 0  # Ticks left to run under cProfile
+        self.capture_path = None
+        self.profile = None
+
+    def enable(self) -> None:
+        """Installs the wrappers, must be called before any bound methods
+        (e.g. the game's tick handed to a loop) are handed out
+        """
+        if self.wrapped:
+            return
+        game, grid, style = self.game, self.game.grid, self.game.style
+        self.wrap(game, "tick", "game.tick", self.after_tick)
+        if self.debug:
+            self.install_checks(grid)
+        # Every input goes through input, from on_key, AsyncRunner or a replay
+        self.wrap(game, "input", "game.input")
+        game.events.subscribe(self.count_event)
+        self.wrap(grid, "try_fit", "grid.try_fit")
+        self.wrap(grid, "kick", "grid.kick")
+        self.wrap(grid, "clear_lines", "grid.clear_lines")
+        for name in STYLE_METHODS:
+            if hasattr(style, name):
+                self.wrap(style, name, f'style.{name}')
+
+        shape_fits = grid.shape_fits
+        kick = grid.kick
+        counters = self.counters
+
+        def counted_fits(*args):
+            counters["grid.fit_tests"] += 1
+            return shape_fits(*args)
+
+        def counted_kick(ptype, x, y, old_rot, new_rot):
+            tests = counters["grid.fit_tests"]
+            try:
+                return kick(ptype, x, y, old_rot, new_rot)
+            finally:
+                # Game.act also moves pieces through kick without rotating them,
+                # and the first test of a rotation is the unkicked position
+                if old_rot % 4 != new_rot % 4:
+                    counters["grid.kick_tests"] += max(counters["grid.fit_tests"] - tests - 1, 0)
+        grid.shape_fits = counted_fits
+        grid.kick = counted_kick
+        self.wrapped.append((grid, "shape_fits"))
+
+    def disable(self) -> None:
+        """Removes the wrappers, the collected stats are kept"""
+        self.game.events.unsubscribe(self.count_event)
+        for obj, name in self.wrapped:
+            if name in vars(obj):
+                delattr(obj, name)
+        self.wrapped = []
+
+    def wrap(self, obj, name: str, key: str, after=None) -> None:
+        """Replaces obj.name with a wrapper that times it under key,
+        after is called once the wrapped method returns
+        """
+        func = getattr(obj, name)
+        timer = self.timers.setdefault(key, Timer())
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.calls += 1
+                timer.seconds += clock() - start
+                if after:
+                    after()
+        setattr(obj, name, wrapper)
+        self.wrapped.append((obj, name))
+
+    def count_event(self, event) -> None:
+        """Counts every event emitted by the game by type"""
+        self.counters[f'events.{type(event).__name__}'] += 1
+
+    def install_checks(self, grid: Grid) -> None:
+        """Wraps add_piece and clear_lines to check only the rows they changed,
+        so the cost of the checks does not grow with the size of the board
+        """
+        checker = GridChecker(grid)
+        add_piece = grid.add_piece
+        clear_lines = grid.clear_lines
+        restore = grid.restore
+        clear = grid.clear
+
+        def checked_add(piece):
+            add_piece(piece)
+            self.check(checker, {piece.y + y for _x, y in piece.get_coords()})
+
+        def checked_clear():
+            cleared = clear_lines()
+            if cleared:
+                moved = {new_y for old_y, new_y in enumerate(grid.row_map)
+                         if new_y is not None and new_y != old_y}
+                self.check(checker, moved.union(range(cleared)))
+            return cleared
+
+        def checked_restore(cells):
+            restore(cells)
+            checker.rehash()
+            self.check(checker, range(grid.height))
+
+        def checked_reset():
+            clear()
+            checker.rehash()
+        grid.add_piece = checked_add
+        grid.clear_lines = checked_clear
+        grid.restore = checked_restore
+        grid.clear = checked_reset
+        self.wrapped += [(grid, "add_piece"), (grid, "restore"), (grid, "clear")]
+
+    def check(self, checker: GridChecker, rows) -> None:
+        """Prints and counts the errors the checker finds in the given rows"""
+        errors = checker.check(sorted(rows))
+        self.counters["debug.checked_rows"] += len(rows)
+        self.counters["debug.errors"] += len(errors)
+        for error in errors:
+            print(error)
+
+    def after_tick(self) -> None:
+        """Stops a capture once it has run for enough ticks"""
+        if self.capture_ticks:
+            self.capture_ticks -= 1
+            if not self.capture_ticks:
+                self.finish_capture()
+
+    def capture(self, ticks: int, path: str = None) -> None:
+        """Profiles everything the game runs for the next ticks ticks with cProfile,
+        the stats are written to path (viewable with snakeviz or converted to a flamegraph
+        with flameprof) or printed if there is no path
+        """
+        self.enable()
+        self.capture_ticks = ticks
+        self.capture_path = path
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def finish_capture(self) -> None:
+        """Stops the capture started by capture early"""
+        if self.profile is None:
+            return
+        self.profile.disable()
+        if self.capture_path:
+            self.profile.dump_stats(self.capture_path)
+        else:
+            pstats.Stats(self.profile).sort_stats("cumulative").print_stats(20)
+        self.profile = None
+        self.capture_ticks = 0
+
+    def snapshot(self) -> Stats:
+        """Returns a copy of the collected stats"""
+        return Stats({name: Sample(timer.calls, timer.seconds)
+                      for name, timer in self.timers.items()}, dict(self.counters))
+
+    def reset(self) -> None:
+        """Zeroes every timer and counter"""
+        for timer in self.timers.values():
+            timer.calls = 0
+            timer.seconds = 0.0
+        self.counters.clear()
@@ -0,0 +1,149 @@
+"""Piece randomizers, a generator decides the piece sequence and Randomizer queues it."""
+import random
+from abc import ABC, abstractmethod
+
+from piece import PType
+
+
+class PieceGenerator(ABC):
+    """Produces the piece sequence a few pieces at a time"""
+    name = ""
+
+    @abstractmethod
+    def generate(self, rng: random.Random) -> list[PType]:
+        """Returns the next pieces of the sequence"""
+
+    def snapshot(self) -> tuple:
+        """Returns the state the generator needs besides rng, see restore"""
+        return ()
+
+    def restore(self, state: tuple) -> None:
+        """Restores a state returned by snapshot"""
+
+
+class BagGenerator(PieceGenerator):
+    """Deals shuffled bags containing copies of every piece, 7-bag by default"""
+    name = "7bag"
+
+    def __init__(self, copies: int = 1) -> None:
+        self.pieces = list(PType) * copies
+
+    def generate(self, rng: random.Random) -> list[PType]:
+        bag = self.pieces.copy()
+        rng.shuffle(bag)
+        return bag
+
+
+class FourteenBagGenerator(BagGenerator):
+    """Bags of two copies of every piece"""
+    name = "14bag"
+
+    def __init__(self) -> None:
+        super().__init__(2)
+
+
+class RandomGenerator(PieceGenerator):
+    """Picks every piece independently"""
+    name = "random"
+
+    def generate(self, rng: random.Random) -> list[PType]:
+        return rng.choices(list(PType), k=7)
+
+
+class HistoryGenerator(PieceGenerator):
+    """TGM style randomizer, pieces that are in the history of the last 4 pieces
+    are rerolled up to tries times and the first piece is never S, Z or O
+    """
+    name = "tgm"
+    first = (PType.I, PType.J, PType.L, PType.T)
+
+    def __init__(self, tries: int = 6) -> None:
+        self.tries = tries
+        self.history = (PType.Z, PType.S, PType.S, PType.Z)
+        self.started = False
+
+    def generate(self, rng: random.Random) -> list[PType]:
+        if not self.started:
+            self.started = True
+            ptype = rng.choice(self.first)
+        else:
+            types = list(PType)
+            ptype = rng.choice(types)
+            for _try in range(self.tries - 1):
+                if ptype not in self.history:
+                    break
+                ptype = rng.choice(types)
+        self.history = self.history[1:] + (ptype,)
+        return [ptype]
+
+    def snapshot(self) -> tuple:
+        return self.history, self.started
+
+    def restore(self, state: tuple) -> None:
+        self.history, self.started = state
+
+
+GENERATORS = {
+    generator.name: generator
+    for generator in (BagGenerator, FourteenBagGenerator, RandomGenerator, HistoryGenerator)
+}
+
+
+class Randomizer:
+    """Queue of upcoming pieces stored in a ring buffer, drawing is O(1) and peek
+    refills the queue from the generator as deep as it is asked to look
+    """
+
+    def __init__(self, rng: random.Random, generator: PieceGenerator = None,
+                 capacity: int = 16) -> None:
+        self.rng = rng
+        self.generator = generator if generator is not None else BagGenerator()
+        self.buffer = [None] * capacity  # capacity is always a power of two
+        self.mask = capacity - 1
+        self.head = 0  # Index of the next piece
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def draw(self) -> PType:
+        """Removes and returns the next piece"""
+        if not self.size:
+            self.fill()
+        ptype = self.buffer[self.head]
+        self.head = (self.head + 1) & self.mask
+        self.size -= 1
+        return ptype
+
+    def peek(self, depth: int) -> list[PType]:
+        """Returns the next depth pieces without drawing them"""
+        while self.size < depth:
+            self.fill()
+        return [self.buffer[(self.head + i) & self.mask] for i in range(depth)]
+
+    def fill(self) -> None:
+        """Appends the next pieces of the generator to the queue"""
+        for ptype in self.generator.generate(self.rng):
+            self.push(ptype)
+
+    def push(self, ptype: PType) -> None:
+        """Appends a piece to the queue, doubling the buffer if it is full"""
+        if self.size == len(self.buffer):
+            self.buffer = self.peek(self.size) + [None] * self.size
+            self.mask = len(self.buffer) - 1
+            self.head = 0
+        self.buffer[(self.head + self.size) & self.mask] = ptype
+        self.size += 1
+
+    def snapshot(self) -> tuple:
+        """Returns the queued pieces and the generator state, the rng is not included"""
+        return tuple(self.peek(self.size)), self.generator.snapshot()
+
+    def restore(self, state: tuple) -> None:
+        """Restores a state returned by snapshot"""
+        queue, generator_state = state
+        self.head = 0
+        self.size = 0
+        for ptype in queue:
+            self.push(ptype)
+        self.generator.restore(generator_state)
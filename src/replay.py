@@ -0,0 +1,151 @@
+"""Records games as a seed plus tick-stamped inputs and replays them headlessly."""
+import argparse
+import hashlib
+import struct
+import time
+
+from basestyle import NullStyle
+from game import Action, Game, GameState
+from grid import Grid
+from randomizer import GENERATORS
+
+MAGIC = b"TRPL"
+VERSION = 2
+# magic, version, generator, width, height, seed, end frame, board hash, input count
+HEADER = struct.Struct("<4sBBHHQIQI")
+INPUT = struct.Struct("<IB")  # frame, Action value
+
+
+def board_hash(grid: Grid) -> int:
+    """Returns a 64 bit hash of the cells of the grid"""
+    return int.from_bytes(hashlib.blake2b(b"".join(grid.cells), digest_size=8).digest(), "little")
+
+
+class Replay:
+    """A recorded game, the seed and inputs are enough to re-simulate it exactly"""
+
+    # pylint: disable=too-many-positional-arguments
+    def __init__(self, seed: int, width: int, height: int, inputs: list[tuple[int, Action]],
+                 frames: int, final_hash: int, generator: str = "7bag") -> None:
+        self.seed = seed
+        self.generator = generator  # Name of the piece generator, see GENERATORS
+        self.width = width
+        self.height = height
+        self.inputs = inputs
+        self.frames = frames
+        self.final_hash = final_hash
+
+    def to_bytes(self) -> bytes:
+        """Encodes the replay in the binary replay format"""
+        header = HEADER.pack(MAGIC, VERSION, list(GENERATORS).index(self.generator),
+                             self.width, self.height, self.seed,
+                             self.frames, self.final_hash, len(self.inputs))
+        return header + b"".join(INPUT.pack(frame, action.value) for frame, action in self.inputs)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        """Decodes a replay created by to_bytes"""
+        magic, version, generator, width, height, seed, frames, final_hash, count = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a version {VERSION} replay')
+        inputs = [(frame, Action(value))
+                  for frame, value in INPUT.iter_unpack(data[HEADER.size:HEADER.size
+                                                            + count * INPUT.size])]
+        return cls(seed, width, height, inputs, frames, final_hash, list(GENERATORS)[generator])
+
+    def save(self, path: str) -> None:
+        """Writes the replay to a file"""
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        """Reads a replay from a file"""
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+class Recorder:
+    """Records the inputs of a game from its first frame"""
+
+    def __init__(self, game: Game) -> None:
+        if game.frame != 0:
+            raise ValueError("Games must be recorded from their first frame")
+        self.game = game
+        self.inputs = []
+        game.recorder = self
+
+    def record(self, frame: int, action: Action) -> None:
+        """Called by Game.input for every input"""
+        self.inputs.append((frame, action))
+
+    def finish(self) -> Replay:
+        """Stops recording and returns the replay up to the current frame"""
+        self.game.recorder = None
+        grid = self.game.grid
+        return Replay(self.game.seed, grid.width, grid.height, self.inputs,
+                      self.game.frame, board_hash(grid), self.game.randomizer.generator.name)
+
+
+class Player:
+    """Re-simulates a replay without a display as fast as possible,
+    a snapshot is kept every snapshot_interval frames to allow seeking backwards
+    """
+
+    def __init__(self, replay: Replay, snapshot_interval: int = 1000) -> None:
+        self.replay = replay
+        self.snapshot_interval = snapshot_interval
+        grid = Grid(replay.width, replay.height)
+        self.game = Game(NullStyle(grid), grid, replay.seed, GENERATORS[replay.generator]())
+        self.index = 0  # Index of the next input to apply
+        self.snapshots = {0: self.snapshot()}
+
+    def snapshot(self) -> tuple[GameState, int]:
+        """Returns a copy of the current state"""
+        return self.game.snapshot(), self.index
+
+    def advance(self, frame: int) -> None:
+        """Simulates forward until the game reaches the given frame"""
+        game = self.game
+        inputs = self.replay.inputs
+        while game.frame < frame:
+            while self.index < len(inputs) and inputs[self.index][0] == game.frame:
+                game.input(inputs[self.index][1])
+                self.index += 1
+            game.tick()
+            if self.snapshot_interval and game.frame % self.snapshot_interval == 0:
+                self.snapshots.setdefault(game.frame, self.snapshot())
+
+    def seek(self, frame: int) -> None:
+        """Moves to the given frame, restoring the closest earlier snapshot if needed"""
+        if frame < self.game.frame:
+            start = max(snap for snap in self.snapshots if snap <= frame)
+            state, self.index = self.snapshots[start]
+            self.game.restore(state)
+        self.advance(frame)
+
+    def run(self) -> bool:
+        """Plays the rest of the replay and returns whether the final board hash matches"""
+        self.advance(self.replay.frames)
+        return board_hash(self.game.grid) == self.replay.final_hash
+
+
+def main() -> None:
+    """Command line entry point, verifies a replay and prints how fast it was simulated"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("replay")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    player = Player(replay)
+    start = time.perf_counter()
+    matches = player.run()
+    elapsed = time.perf_counter() - start
+    print(f'Frames: {replay.frames} in {elapsed:.3f}s ({replay.frames / elapsed:.0f}/s)')
+    print("Final board matches" if matches else "Final board DOES NOT match")
+    raise SystemExit(0 if matches else 1)
+
+
+if __name__ == "__main__":
+    main()
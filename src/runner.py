@@ -0,0 +1,138 @@
+"""Runs the game on an asyncio event loop, so other tasks can share it without threads."""
+import asyncio
+import time
+from tkinter import TclError, Tk
+
+from game import KEYS, Action, Game
+from scheduler import Histogram, draw_overlay
+
+
+class AsyncRunner:
+    """Game loop made of cooperative tasks: ticks on absolute deadlines so timer jitter
+    does not accumulate, Tk is pumped often so key presses are seen quickly, and inputs
+    are queued with the time they arrived and applied as soon as the input task wakes up
+    """
+
+    # pylint: disable=too-many-positional-arguments
+    def __init__(self, game: Game, window: Tk, tick_rate: int = 100, render_rate: int = 60,
+                 pump_rate: int = 500, max_ticks: int = 10) -> None:
+        self.game = game
+        self.window = window
+        self.tick_time = 1 / tick_rate
+        self.render_time = 1 / render_rate
+        self.pump_time = 1 / pump_rate
+        self.max_ticks = max_ticks  # Most ticks to catch up on at once, see Scheduler
+        # (perf_counter time, Action) of every input not applied yet, see push
+        self.inputs = asyncio.Queue()
+        self.stats = {"tick": Histogram(), "render": Histogram(), "update": Histogram(),
+                      "input latency": Histogram(), "tick lateness": Histogram()}
+        self.dropped_ticks = 0
+        self.skipped_frames = 0
+        self.overlay = None  # Canvas to draw the frame times on, if any
+        self.tasks = []  # Extra coroutines to run on the same loop, see add_task
+        self.running = False
+
+    def add_task(self, coroutine) -> None:
+        """Runs the coroutine alongside the game once run is called, it is cancelled
+        when the game stops
+        """
+        self.tasks.append(coroutine)
+
+    def on_key(self, event) -> None:
+        """Tk key handler, queues the input with the time it was received"""
+        action = KEYS.get(event.keysym.lower())
+        if action is None:
+            print("Unknown key:", event.keysym.lower())
+            return
+        self.inputs.put_nowait((time.perf_counter(), action))
+
+    def push(self, action: Action) -> None:
+        """Queues an input from outside Tk, e.g. a network client, inputs pushed
+        before run are applied once it starts
+        """
+        self.inputs.put_nowait((time.perf_counter(), action))
+
+    def timed(self, name: str, func) -> None:
+        """Calls func and records how long it took"""
+        start = time.perf_counter()
+        func()
+        self.stats[name].add(time.perf_counter() - start)
+
+    async def tick_loop(self) -> None:
+        """Ticks the game at tick_rate, each deadline is computed from the start time"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while self.running:
+            now = loop.time()
+            behind = int((now - deadline) / self.tick_time)
+            if behind >= self.max_ticks:
+                self.dropped_ticks += behind - self.max_ticks + 1
+                deadline += (behind - self.max_ticks + 1) * self.tick_time
+            while deadline <= now:
+                self.stats["tick lateness"].add(now - deadline)
+                self.timed("tick", self.game.tick)
+                deadline += self.tick_time
+            await asyncio.sleep(deadline - loop.time())
+
+    async def input_loop(self) -> None:
+        """Applies queued inputs as soon as they arrive"""
+        while self.running:
+            received, action = await self.inputs.get()
+            self.game.input(action)
+            self.stats["input latency"].add(time.perf_counter() - received)
+
+    async def render_loop(self) -> None:
+        """Renders at render_rate, frames that are missed are skipped"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while self.running:
+            self.timed("render", self.render)
+            deadline += self.render_time
+            now = loop.time()
+            if deadline < now:
+                missed = int((now - deadline) / self.render_time) + 1
+                self.skipped_frames += missed
+                deadline += missed * self.render_time
+            await asyncio.sleep(deadline - now)
+
+    def render(self) -> None:
+        """Renders the game and the frame time overlay if enabled, see Scheduler.render"""
+        self.game.render()
+        if self.overlay and self.stats["render"].count % 30 == 0:
+            draw_overlay(self.overlay, self.stats, self.skipped_frames, self.dropped_ticks)
+
+    async def pump_loop(self) -> None:
+        """Processes Tk events (including key presses) until the window is closed"""
+        while self.running:
+            try:
+                self.timed("update", self.window.update)
+            except TclError:
+                break  # Window was closed
+            await asyncio.sleep(self.pump_time)
+        self.running = False
+
+    async def main(self) -> None:
+        """Runs every task until the window is closed or stop is called"""
+        self.running = True
+        self.window.bind("<Key>", self.on_key)
+        pump = asyncio.create_task(self.pump_loop())
+        others = [asyncio.create_task(coroutine) for coroutine in
+                  (self.tick_loop(), self.input_loop(), self.render_loop(), *self.tasks)]
+        await pump
+        for task in others:
+            task.cancel()
+        await asyncio.gather(*others, return_exceptions=True)
+
+    def run(self) -> None:
+        """Runs the game on a new event loop, blocking until it stops"""
+        asyncio.run(self.main())
+
+    def stop(self) -> None:
+        """Stops every task after their current iteration"""
+        self.running = False
+
+    def dump(self) -> str:
+        """Returns the timing histograms as text"""
+        lines = [f'{name}: {hist}' for name, hist in self.stats.items()]
+        lines.append(f'skipped frames: {self.skipped_frames}, dropped ticks: {self.dropped_ticks}')
+        return "\n".join(lines)
@@ -0,0 +1,146 @@
+import time
+from tkinter import Canvas, TclError, Tk
+
+from game import Game
+
+
+class Histogram:
+    """Histogram of durations with power of two millisecond buckets"""
+
+    bounds = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)  # Upper bound of each bucket in ms
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Records a single duration"""
+        millis = seconds * 1000
+        self.count += 1
+        self.total += millis
+        self.max = max(self.max, millis)
+        for i, bound in enumerate(self.bounds):
+            if millis <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def mean(self) -> float:
+        """Returns the mean duration in ms"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the upper bound (ms) of the bucket containing the given fraction of samples"""
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return 0.0
+
+    def __str__(self) -> str:
+        return (f'n={self.count} mean={self.mean():.2f}ms p50<={self.percentile(0.5)}ms '
+                f'p99<={self.percentile(0.99)}ms max={self.max:.2f}ms')
+
+
+class Scheduler:
+    """Fixed timestep game loop, the game is ticked at a fixed rate using an accumulator
+    while rendering runs at its own rate and skips frames when it falls behind
+    """
+
+    def __init__(self, game: Game, window: Tk, tick_rate: int = 100, render_rate: int = 60,
+                 max_ticks: int = 10) -> None:
+        self.game = game
+        self.window = window
+        self.tick_time = 1 / tick_rate
+        self.render_time = 1 / render_rate
+        # Most ticks to catch up on per loop, any further backlog is dropped
+        self.max_ticks = max_ticks
+        self.stats = {"tick": Histogram(), "render": Histogram(), "update": Histogram()}
+        self.dropped_ticks = 0
+        self.skipped_frames = 0
+        self.overlay = None  # Canvas to draw the frame times on, if any
+        self.running = False
+
+    def timed(self, name: str, func) -> None:
+        """Calls func and records how long it took"""
+        start = time.perf_counter()
+        func()
+        self.stats[name].add(time.perf_counter() - start)
+
+    def run(self) -> None:
+        """Runs the loop until stop is called or the window is closed"""
+        self.running = True
+        accumulator = 0.0
+        last = time.perf_counter()
+        next_render = last
+        while self.running:
+            now = time.perf_counter()
+            accumulator += now - last
+            last = now
+
+            ticks = 0
+            while accumulator >= self.tick_time:
+                if ticks == self.max_ticks:
+                    self.dropped_ticks += int(accumulator / self.tick_time)
+                    accumulator = 0.0
+                    break
+                self.timed("tick", self.game.tick)
+                accumulator -= self.tick_time
+                ticks += 1
+
+            if now >= next_render:
+                self.timed("render", self.render)
+                next_render += self.render_time
+                if next_render < now:
+                    # Fell behind, skip the missed frames instead of rendering them all
+                    missed = int((now - next_render) / self.render_time) + 1
+                    self.skipped_frames += missed
+                    next_render += missed * self.render_time
+
+            try:
+                self.timed("update", self.window.update)
+            except TclError:
+                break  # Window was closed
+            wait = min(last + self.tick_time - accumulator, next_render) - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        self.running = False
+
+    def stop(self) -> None:
+        """Stops the loop after the current iteration"""
+        self.running = False
+
+    def render(self) -> None:
+        """Renders the game and the frame time overlay if enabled"""
+        self.game.render()
+        if self.overlay and self.stats["render"].count % 30 == 0:
+            self.draw_overlay(self.overlay)
+
+    def draw_overlay(self, canvas: Canvas) -> None:
+        """Draws the mean and max frame times in the corner of the canvas"""
+        draw_overlay(canvas, self.stats, self.skipped_frames, self.dropped_ticks)
+
+    def dump(self) -> str:
+        """Returns the frame time histograms as text"""
+        lines = [f'{name}: {hist}' for name, hist in self.stats.items()]
+        lines.append(f'skipped frames: {self.skipped_frames}, dropped ticks: {self.dropped_ticks}')
+        return "\n".join(lines)
+
+
+def draw_overlay(canvas: Canvas, stats: dict[str, Histogram], skipped_frames: int,
+                 dropped_ticks: int) -> None:
+    """Draws the mean and max of every histogram in the corner of the canvas"""
+    text = "\n".join(
+        f'{name}: {hist.mean():.2f}/{hist.max:.1f}ms' for name, hist in stats.items())
+    text += f'\nskipped: {skipped_frames} dropped: {dropped_ticks}'
+    item = canvas.find_withtag("frametimes")
+    if item:
+        canvas.itemconfig(item, text=text)
+        canvas.tag_raise(item)
+    else:
+        canvas.create_text(4, 4, text=text, anchor="nw", fill="white",
+                           font=("TkFixedFont", 8), tags="frametimes")
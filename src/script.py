@@ -1,14 +1,40 @@
 """Tetris game written in Python 3.10+ using tkinter for graphics."""
+import argparse
 import tkinter as tk
-from time import sleep
 
 from game import Game
 from grid import Grid
-from style import ResizingCanvas, RGBStyle
+from profiler import Profiler
+from randomizer import GENERATORS
+from replay import Recorder
+from runner import AsyncRunner
+from scheduler import Scheduler
+from style import RasterStyle, ResizingCanvas, RGBStyle
 
 
 def main() -> None:
     """Main entry point for the application"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fps", type=int, default=60, help="render rate")
+    parser.add_argument("--stats", action="store_true",
+                        help="show frame times and print them on exit")
+    parser.add_argument("--record", metavar="PATH", help="save a replay of the session on exit")
+    parser.add_argument("--style", choices=("rgb", "raster"), default="rgb",
+                        help="draw blocks as canvas items (rgb) or blit them into a single image")
+    parser.add_argument("--randomizer", choices=GENERATORS, default="7bag",
+                        help="how the piece sequence is generated")
+    parser.add_argument("--profile", action="store_true",
+                        help="time the game's subsystems and print the stats on exit")
+    parser.add_argument("--capture", metavar="TICKS", type=int,
+                        help="run cProfile for the first TICKS ticks, see --capture-output")
+    parser.add_argument("--capture-output", metavar="PATH",
+                        help="write the cProfile stats to a file instead of printing them")
+    parser.add_argument("--debug", action="store_true",
+                        help="check the rows changed by every lock and line clear")
+    parser.add_argument("--loop", choices=("scheduler", "asyncio"), default="scheduler",
+                        help="run the game with the fixed timestep scheduler or on asyncio")
+    args = parser.parse_args()
+
     window = tk.Tk()
     window.title("Tetris")
     grid = Grid(10, 20)
@@ -16,17 +42,33 @@ def main() -> None:
     frame.pack(fill=tk.BOTH, expand=True)
     canvas = ResizingCanvas(frame, width=400, height=500, highlightthickness=0)
     canvas.pack(fill=tk.BOTH, expand=True)
-    style = RGBStyle(grid, canvas)
+    style = RasterStyle(grid, canvas) if args.style == "raster" else RGBStyle(grid, canvas)
 
-    game = Game(style, grid)
-    window.bind("<Key>", game.on_key)
+    game = Game(style, grid, generator=GENERATORS[args.randomizer]())
+    recorder = Recorder(game) if args.record else None
+    profiler = None
+    if args.profile or args.capture or args.debug:
+        profiler = Profiler(game, args.debug)
+        profiler.enable()
+        if args.capture:
+            profiler.capture(args.capture, args.capture_output)
     canvas.addtag_all("all")
 
-    while True:
-        game.tick()
-        game.render()
-        window.update()
-        sleep(0.01)
+    if args.loop == "asyncio":
+        # The runner binds the keys itself to queue inputs
+        loop = AsyncRunner(game, window, render_rate=args.fps)
+    else:
+        window.bind("<Key>", game.on_key)
+        loop = Scheduler(game, window, render_rate=args.fps)
+    if args.stats:
+        loop.overlay = canvas
+    loop.run()
+    if args.stats:
+        print(loop.dump())
+    if args.profile:
+        print(profiler.snapshot())
+    if recorder:
+        recorder.finish().save(args.record)
 
 
 if __name__ == "__main__":
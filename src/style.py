@@ -1,80 +1,105 @@
-from abc import ABC, abstractmethod
-from tkinter import Canvas
+from abc import abstractmethod
+from tkinter import Canvas, PhotoImage
 
+from basestyle import Style
+from events import PieceState
 from grid import Grid
-from piece import Block, Piece, PType, generate_piece
+from piece import SHAPES, Block, Piece, PType, generate_piece
 
+RESIZE_DELAY = 50  # ms without <Configure> events before a resize is laid out
 
-class Style(ABC):
-    """An abstract class to allow for multiple styles of Tetris"""
 
-    name = "Undefined"
+class CanvasStyle(Style):
+    """A style that draws on a Tk canvas, it lays out again once resizing has settled
+    and skips redrawing the active and ghost piece while they have not moved
+    """
 
-    def __init__(self, grid: Grid):
-        self.grid = grid
-
-    @abstractmethod
-    def draw_piece(self, piece: Piece, active=False) -> list[Block]:
-        """Draws the specified piece on the canvas using its internal coordinates
-        isActive is intended to allow for support for shadow/preview pieces
-        """
-
-    @abstractmethod
-    def draw_boundaries(self) -> None:
-        """Draws the boundaries of the grid, can also be used to stylize
-        boundaries, grid, etc."""
+    def __init__(self, grid: Grid, canvas: Canvas) -> None:
+        super().__init__(grid)
+        self.canvas = canvas
+        # Last drawn (piece, type, x, y, rotation) of the active piece
+        self.drawn_state = None
+        # Last drawn (type, x, rotation, y) of the ghost piece
+        self.ghost_state = None
+        self.resize_job = None  # Pending relayout, see resize
+        self.canvas.bind("<Configure>", self.resize, add=True)
 
-    @abstractmethod
-    def draw_block(self, x, y) -> str:
-        """Intended to draw a single block at a given coordinate, should be a generic method that
-        returns a string ID that can be used to update the block later
+    #pylint: disable=unused-argument
+    def resize(self, event):
+        """"Resize listener, events are coalesced into a single relayout
+        once no new event has arrived for RESIZE_DELAY ms
         """
+        if self.resize_job:
+            self.canvas.after_cancel(self.resize_job)
+        self.resize_job = self.canvas.after(RESIZE_DELAY, self.finish_resize)
 
-    @abstractmethod
-    def coord_pixel(self, x, y) -> tuple[int, int]:
-        """Converts a coordinate to a pixel"""
+    def finish_resize(self) -> None:
+        """Lays out the size the canvas was resized to"""
+        self.resize_job = None
+        self.relayout()
 
     @abstractmethod
-    def pixel_coord(self, x, y) -> tuple[int, int]:
-        """Converts a pixel to a coordinate"""
-
-    @abstractmethod
-    def clear_lines(self) -> None:
-        """Clears the lines that have been filled, called AFTER grid clearLines is called"""
+    def relayout(self) -> None:
+        """Updates everything drawn for the current canvas size"""
 
-    @abstractmethod
-    def clear_board(self) -> None:
-        """Clears the entire board, should reset the board to an empty grid"""
+    def moved(self, piece: Piece) -> bool:
+        """Returns whether the active piece changed since it was last drawn,
+        and records it as drawn
+        """
+        state = (piece, piece.type, piece.x, piece.y, piece.rotation)
+        if state == self.drawn_state:
+            return False
+        self.drawn_state = state
+        return True
+
+    def draw_ghost(self, piece: Piece) -> None:
+        """Draws the transparent preview of where the piece will land, the drop position
+        is only searched for again if the piece moved sideways, rotated or the board changed
+        """
+        ghost = self.ghost_state
+        if ghost and ghost[:3] == (piece.type, piece.x, piece.rotation) and piece.y <= ghost[3]:
+            return  # Falling towards the same landing position
+        ghost_y = piece.y + self.grid.drop_distance(piece.type, piece.rotation, piece.x, piece.y)
+        self.ghost_state = (piece.type, piece.x, piece.rotation, ghost_y)
+        self.place_ghost(piece, ghost_y)
 
     @abstractmethod
-    def draw_next(self, pieces: list[PType]) -> None:
-        """Draws the next piece(s) in the queue"""
+    def place_ghost(self, piece: Piece, ghost_y: int) -> None:
+        """Draws the ghost of the piece with its top at ghost_y"""
 
-    @abstractmethod
-    def draw_hold(self, old_piece: Piece, hold_type: PType) -> None:
-        """Draws the hold piece, old_piece is given to allow for removal"""
+    def invalidate(self) -> None:
+        """Forces the active and ghost piece to be redrawn on the next frame"""
+        self.drawn_state = None
+        self.ghost_state = None
 
 
-class RGBStyle(Style):
+class RGBStyle(CanvasStyle):  # pylint: disable=too-many-public-methods
     """Simple RGB implementation"""
     name = "RGB"
 
     def __init__(self, grid: Grid, canvas: Canvas) -> None:
-        super().__init__(grid)
-        self.canvas = canvas
+        super().__init__(grid, canvas)
+        # IDs of every block that exists on the canvas, see draw_block and delete_block
+        self.items = set()
         self.init_window()
         self.next_pieces = []
         self.preview_blocks = []
         self.hold_piece = []
-        self.canvas.bind("<Configure>", self.resize, add=True)
-        self.active_piece = None
+        self.board = {}  # Block of every filled cell of the board, see draw_locked
 
-    #pylint: disable=unused-argument
-    def resize(self, event):
-        """"Resize listener"""
+    def relayout(self) -> None:
+        """Recomputes the layout for the current canvas size and moves every existing item
+        to it, unlike force_refresh nothing is deleted or recreated
+        """
         self.init_window()
         self.draw_boundaries()
-        self.force_refresh()
+        pieces = [*self.next_pieces, self.hold_piece, self.active_piece]
+        blocks = list(self.board.values())
+        blocks += self.preview_blocks
+        blocks += [block for piece in pieces if piece for block in piece.blocks]
+        for block in blocks:
+            if block.id in self.items:
+                self.draw_block(block.x, block.y, block.id, None)
 
     def init_window(self):
         """Initializes window and grid dimensions"""
@@ -99,8 +124,9 @@ class RGBStyle(Style):
             uid = self.canvas.create_rectangle(
                 bx, by, bx + self.pixel_size, by + self.pixel_size, fill=color
             )
+            self.items.add(uid)
             return uid
-        if uid not in self.canvas.find_all():
+        if uid not in self.items:
             raise Exception(f'Block ID not found ({uid})')
         if color:
             self.canvas.itemconfig(uid, fill=color)
@@ -108,57 +134,50 @@ class RGBStyle(Style):
                            by + self.pixel_size)
         return uid
 
+    def delete_block(self, uid) -> None:
+        """Deletes a block created by draw_block from the canvas"""
+        self.items.discard(uid)
+        self.canvas.delete(uid)
+
     def draw_piece(self, piece: Piece, active=False) -> list[Block]:
-        index = 0
-        blocks = []
-        for x, y in piece.get_coords():
-            block = Block(
-                piece,
-                piece.x + x,
-                piece.y + y,
-                self.draw_block(
-                    piece.x + x,
-                    piece.y + y,
-                    piece.blocks[index].id if index < len(
-                        piece.blocks) else None,
-                    self.get_color(piece.type),
-                ),
-            )
-            blocks.append(block)
-            index += 1
+        if active and not self.moved(piece):
+            return piece.blocks  # Nothing has moved since the last frame
+        for index, (x, y) in enumerate(piece.get_coords()):
+            self.place_block(piece.blocks, index, piece.type, piece.x + x, piece.y + y)
 
         if not active:
-            return blocks
+            if piece is self.active_piece:
+                self.active_piece = None  # Locked, its blocks now belong to the grid
+                self.ghost_state = None  # The landing position may change
+            return piece.blocks
         self.active_piece = piece
-        o_y = piece.y
-        while self.grid.try_fit(piece):
-            piece.y += 1
-        piece.y -= 1
-
-        index = 0
-        for x, y in piece.get_coords():
-            block = Block(
-                piece,
-                piece.x + x,
-                piece.y + y,
-                self.draw_block(
-                    piece.x + x,
-                    piece.y + y,
-                    self.preview_blocks[index].id
-                    if index < len(self.preview_blocks)
-                    else None,
-                    self.get_color(piece.type),
-                ),
-            )
-            # Make preview piece transparent
-            self.canvas.itemconfig(block.id, stipple="gray12")
-            if index >= len(self.preview_blocks):
-                self.preview_blocks.append(block)
-            else:
-                self.preview_blocks[index] = block
-            index += 1
-        piece.y = o_y
-        return blocks
+        self.draw_ghost(piece)
+        return piece.blocks
+
+    def draw_locked(self, state: PieceState, cells: tuple[tuple[int, int], ...]) -> None:
+        """Moves the active piece's blocks to where it locked, they now belong to the board"""
+        for block in self.draw_piece(self.track(state)):
+            self.board[(block.x, block.y)] = block
+
+    def place_block(self, blocks: list[Block], index: int, ptype: PType, x: int, y: int) -> Block:
+        """Moves the index-th block of blocks to x, y, creating it if it does not exist yet"""
+        if index < len(blocks):
+            block = blocks[index]
+            block.type, block.x, block.y = ptype, x, y
+            block.id = self.draw_block(x, y, block.id, self.get_color(ptype))
+            return block
+        block = Block(ptype, x, y, self.draw_block(x, y, None, self.get_color(ptype)))
+        blocks.append(block)
+        return block
+
+    def place_ghost(self, piece: Piece, ghost_y: int) -> None:
+        for index, (x, y) in enumerate(piece.get_coords()):
+            created = index >= len(self.preview_blocks)
+            block = self.place_block(self.preview_blocks, index, piece.type,
+                                     piece.x + x, ghost_y + y)
+            if created:
+                # Make preview piece transparent
+                self.canvas.itemconfig(block.id, stipple="gray12")
 
     def draw_boundaries(self) -> None:
         item = self.canvas.find_withtag("mainbg")
@@ -265,30 +284,49 @@ class RGBStyle(Style):
             case PType.Z:
                 return "red"
 
-    def clear_lines(self) -> None:
-        for block in self.grid.to_delete:
-            self.canvas.delete(block.id)
-        self.grid.to_delete = []
-        for by in range(self.grid.height):
-            for block in self.grid.blocks[by]:
-                if not block:
-                    continue
-                self.draw_block(
-                    block.x, block.y, block.id, self.get_color(
-                        block.piece.type)
-                )
+    def clear_lines(self, row_map: tuple[int, ...]) -> None:
+        self.ghost_state = None  # The landing position may change
+        board = {}
+        for (x, y), block in self.board.items():
+            new_y = row_map[y]
+            if new_y is None:
+                self.delete_block(block.id)
+                continue
+            if new_y != y:  # Only move the blocks of rows that were shifted down
+                block.y = new_y
+                self.draw_block(x, new_y, block.id, None)
+            board[(x, new_y)] = block
+        self.board = board
 
     def clear_board(self) -> None:
         self.canvas.delete("all")
+        self.items.clear()
+        self.board = {}
         self.next_pieces = []
         self.preview_blocks = []
         self.hold_piece = None
+        self.active_piece = None
+        self.invalidate()
+
+    def draw_board(self, cells: tuple[bytes, ...]) -> None:
+        for block in self.board.values():
+            self.delete_block(block.id)
+        self.board = {}
+        for y, row in enumerate(cells):
+            for x, cell in enumerate(row):
+                if cell:
+                    ptype = PType(cell)
+                    self.board[(x, y)] = Block(ptype, x, y,
+                                               self.draw_block(x, y, None, self.get_color(ptype)))
+        self.invalidate()
 
     def draw_next(self, pieces: list[PType]) -> None:
         for i in range(min(len(pieces), 4)):
             next_piece = self.next_pieces[i] if i < len(
                 self.next_pieces) else None
-            ptype = pieces[len(pieces) - 1 - i]
+            ptype = pieces[i]
+            if next_piece and next_piece.type == ptype:
+                continue  # Already showing this piece
             if not next_piece:
                 next_piece = Piece(self.grid.width, self, ptype)
                 self.next_pieces.append(next_piece)
@@ -305,39 +343,43 @@ class RGBStyle(Style):
             self.draw_piece(next_piece)
 
     def force_refresh(self) -> None:
-        """"Forces objects to be refreshed, primarily used for window resizing"""
-        for row in self.grid.blocks:
-            for block in row:
-                if not block:
-                    continue
-                self.canvas.delete(block.id)
-                block.id = self.draw_block(
-                    block.x, block.y, None, self.get_color(block.piece.type)
-                )
-        self.clear_lines()  # Forces the grid to refresh
+        """"Forces objects to be refreshed by deleting and recreating them, see relayout
+        for resizing which only moves them
+        """
+        self.invalidate()
+        for block in self.board.values():
+            self.delete_block(block.id)
+            block.id = self.draw_block(
+                block.x, block.y, None, self.get_color(block.type)
+            )
         for next_piece in self.next_pieces:
             if not next_piece:
                 continue
             for block in next_piece.blocks:
                 if not block:
                     continue
-                self.canvas.delete(block.id)
+                self.delete_block(block.id)
             next_piece.blocks = []
             next_piece.blocks = self.draw_piece(next_piece)
         for block in self.preview_blocks:
-            self.canvas.delete(block.id)
+            self.delete_block(block.id)
             block.id = self.draw_block(
-                block.x, block.y, None, self.get_color(block.piece.type)
+                block.x, block.y, None, self.get_color(block.type)
             )
             self.canvas.itemconfig(block.id, stipple="gray12")
         if self.active_piece:
-            self.draw_piece(self.active_piece)
+            self.draw_piece(self.active_piece, True)
         if self.hold_piece:
             self.draw_piece(self.hold_piece)
 
-    def draw_hold(self, old_piece: Piece, hold_type: PType) -> None:
-        for block in old_piece.blocks:
-            self.canvas.delete(block.id)
+    def draw_hold(self, hold_type: PType) -> None:
+        if self.active_piece:
+            for block in self.active_piece.blocks:
+                self.delete_block(block.id)
+            self.active_piece = None
+            self.invalidate()
+        if self.hold_piece and self.hold_piece.type == hold_type:
+            return  # Already showing this piece
         if not self.hold_piece:
             self.hold_piece = Piece(self.grid.width + 2, self, hold_type)
             self.hold_piece.y += 1
@@ -347,6 +389,213 @@ class RGBStyle(Style):
         self.draw_piece(self.hold_piece)
 
 
+class RasterStyle(CanvasStyle):  # pylint: disable=too-many-public-methods
+    """Draws the whole game into a single PhotoImage, only the cells that changed since
+    the last frame are blitted (once per frame, when Tk is idle) using cached tiles
+    """
+    name = "Raster"
+    colors = {
+        PType.I: "#00ffff",
+        PType.J: "#0000ff",
+        PType.L: "#ffa500",
+        PType.O: "#ffff00",
+        PType.S: "#00ff00",
+        PType.T: "#a020f0",
+        PType.Z: "#ff0000",
+    }
+    board_color = "#bebebe"
+    panel_color = "#222222"
+    panel_width = 6  # Columns right of the board used for the hold and next pieces
+
+    def __init__(self, grid: Grid, canvas: Canvas, image: PhotoImage = None) -> None:
+        """image is the image to draw into, a new one is put on the canvas if None"""
+        super().__init__(grid, canvas)
+        self.columns = grid.width + self.panel_width
+        self.init_window()
+        self.image = image
+        if image is None:
+            self.image = PhotoImage(master=canvas, width=self.columns * self.pixel_size,
+                                    height=grid.height * self.pixel_size)
+            canvas.create_image(0, 0, image=self.image, anchor="nw", tags="raster")
+        # Keys of the tiles, a key is (color, outlined) and empty cells have no outline
+        self.keys = [(self.board_color, False)] + [(self.colors[ptype], True) for ptype in PType]
+        self.ghost_keys = {ptype: (blend(self.colors[ptype], self.board_color, 0.25), True)
+                           for ptype in PType}
+        self.tiles = {}  # Pixel data of every outlined key at the current pixel size
+        self.shown = {}  # Key blitted at every cell
+        self.dirty = set()  # Cells to check on the next flush
+        self.scheduled = False
+        self.active = {}  # Cell -> PType of the active piece
+        self.ghost = {}  # Cell -> PType of the ghost piece
+        self.next_cells = {}
+        self.hold_cells = {}
+        self.board = {}  # Cell -> PType of every filled cell of the board, see draw_locked
+
+    def relayout(self) -> None:
+        """Resizes the image for the current canvas size, it is only redrawn
+        if the pixel size changed
+        """
+        size = self.pixel_size
+        self.init_window()
+        if size == self.pixel_size:
+            return
+        self.image.configure(width=self.columns * self.pixel_size,
+                             height=self.grid.height * self.pixel_size)
+        self.tiles.clear()
+        self.draw_boundaries()
+
+    def init_window(self):
+        """Initializes the pixel size, which is always a whole number of pixels"""
+        self.width, self.height = self.canvas.winfo_reqwidth(), self.canvas.winfo_reqheight()
+        self.pixel_size = max(1, int(min(self.width / self.columns,
+                                         self.height / self.grid.height)))
+
+    def mark(self, cells) -> None:
+        """Marks cells as changed and schedules a flush"""
+        self.dirty.update(cells)
+        if not self.scheduled:
+            self.scheduled = True
+            self.canvas.after_idle(self.flush)
+
+    def cell_key(self, x: int, y: int) -> tuple[str, bool]:
+        """Returns the key of the tile that should be shown at a cell"""
+        if x >= self.grid.width:
+            ptype = self.next_cells.get((x, y)) or self.hold_cells.get((x, y))
+            return self.keys[ptype.value] if ptype else (self.panel_color, False)
+        ptype = self.active.get((x, y)) or self.board.get((x, y))
+        if ptype:
+            return self.keys[ptype.value]
+        if (x, y) in self.ghost:
+            return self.ghost_keys[self.ghost[(x, y)]]
+        return self.keys[0]
+
+    def flush(self) -> None:
+        """Blits every changed cell whose tile is not already shown"""
+        self.scheduled = False
+        size = self.pixel_size
+        for x, y in self.dirty:
+            if not (0 <= x < self.columns and 0 <= y < self.grid.height):
+                continue
+            key = self.cell_key(x, y)
+            if self.shown.get((x, y)) == key:
+                continue
+            self.shown[(x, y)] = key
+            if key[1]:
+                self.image.put(self.tile(key), to=(x * size, y * size))
+            else:
+                self.image.put(key[0], to=(x * size, y * size, (x + 1) * size, (y + 1) * size))
+        self.dirty.clear()
+
+    def tile(self, key: tuple[str, bool]) -> str:
+        """Returns the pixel data of an outlined tile, built once per pixel size"""
+        data = self.tiles.get(key)
+        if data is None:
+            size = self.pixel_size
+            edge = "{" + " ".join(["#000000"] * size) + "}"
+            inner = "{#000000 " + " ".join([key[0]] * (size - 2)) + " #000000}"
+            data = " ".join([edge] + [inner] * (size - 2) + [edge]) if size > 2 else edge
+            self.tiles[key] = data
+        return data
+
+    def draw_piece(self, piece: Piece, active=False) -> list[Block]:
+        if not active:
+            # Locked or held, the piece may never have been drawn as the active piece
+            # (e.g. hard dropped before the next frame) so its cells are always redrawn,
+            # from the board, and the last drawn active piece and ghost are erased
+            blocks = [Block(piece.type, piece.x + x, piece.y + y, None)
+                      for x, y in piece.get_coords()]
+            self.mark((block.x, block.y) for block in blocks)
+            self.mark(self.active)
+            self.mark(self.ghost)
+            self.active, self.ghost = {}, {}
+            self.active_piece = None
+            self.invalidate()
+            return blocks
+        if not self.moved(piece):
+            return piece.blocks
+        self.active_piece = piece
+        self.mark(self.active)
+        self.active = {(piece.x + x, piece.y + y): piece.type for x, y in piece.get_coords()}
+        self.mark(self.active)
+        self.draw_ghost(piece)
+        return piece.blocks
+
+    def draw_locked(self, state: PieceState, cells: tuple[tuple[int, int], ...]) -> None:
+        for cell in cells:
+            self.board[cell] = state.type
+        super().draw_locked(state, cells)
+
+    def place_ghost(self, piece: Piece, ghost_y: int) -> None:
+        self.mark(self.ghost)
+        self.ghost = {(piece.x + x, ghost_y + y): piece.type for x, y in piece.get_coords()}
+        self.mark(self.ghost)
+
+    def draw_boundaries(self) -> None:
+        self.shown.clear()
+        self.mark((x, y) for y in range(self.grid.height) for x in range(self.columns))
+
+    def draw_block(self, x, y) -> str:
+        return None
+
+    def coord_pixel(self, x, y) -> tuple[int, int]:
+        return x * self.pixel_size, y * self.pixel_size
+
+    def pixel_coord(self, x, y) -> tuple[int, int]:
+        return int(x // self.pixel_size), int(y // self.pixel_size)
+
+    def clear_lines(self, row_map: tuple[int, ...]) -> None:
+        self.ghost_state = None  # The landing position may change
+        self.board = {(x, row_map[y]): ptype for (x, y), ptype in self.board.items()
+                      if row_map[y] is not None}
+        # Every row above the lowest cleared line may have changed
+        lowest = max(y for y, new_y in enumerate(row_map) if new_y is None)
+        self.mark((x, y) for y in range(lowest + 1) for x in range(self.grid.width))
+
+    def clear_board(self) -> None:
+        self.mark(self.board)
+        self.board = {}
+        self.mark(self.active)
+        self.mark(self.ghost)
+        self.mark(self.next_cells)
+        self.mark(self.hold_cells)
+        self.active, self.ghost, self.next_cells, self.hold_cells = {}, {}, {}, {}
+        self.active_piece = None
+        self.invalidate()
+
+    def draw_board(self, cells: tuple[bytes, ...]) -> None:
+        self.mark(self.board)
+        self.board = {(x, y): PType(cell) for y, row in enumerate(cells)
+                      for x, cell in enumerate(row) if cell}
+        self.mark(self.board)
+        self.invalidate()
+
+    def panel_cells(self, ptype: PType, x: int, y: int) -> dict[tuple[int, int], PType]:
+        """Returns the cells of an unrotated piece shown in the panel at x, y"""
+        return {(x + cx, y + cy): ptype for cx, cy in SHAPES[ptype][0].coords}
+
+    def draw_next(self, pieces: list[PType]) -> None:
+        cells = {}
+        for i, ptype in enumerate(pieces[:4]):
+            cells.update(self.panel_cells(ptype, self.grid.width + 2, (i + 1) * 4 + 1))
+        self.mark(self.next_cells)
+        self.next_cells = cells
+        self.mark(cells)
+
+    def draw_hold(self, hold_type: PType) -> None:
+        if self.active_piece:
+            self.draw_piece(self.active_piece)  # Erases it like a locked piece
+        self.mark(self.hold_cells)
+        self.hold_cells = self.panel_cells(hold_type, self.grid.width + 2, 1)
+        self.mark(self.hold_cells)
+
+
+def blend(color: str, background: str, alpha: float) -> str:
+    """Returns color drawn over background with the given opacity, colors are #rrggbb"""
+    channels = [round(int(color[i:i + 2], 16) * alpha + int(background[i:i + 2], 16) * (1 - alpha))
+                for i in (1, 3, 5)]
+    return "#" + "".join(f'{channel:02x}' for channel in channels)
+
+
 class ResizingCanvas(Canvas):  # https://stackoverflow.com/a/22837522
     """A Tkinter canvas that can be resized and automatically rescales its content"""
 
@@ -0,0 +1,40 @@
+import random
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(width: int, height: int) -> tuple[tuple[int, ...], ...]:
+    """Returns a random 64 bit key for every cell indexed by [y][x], the keys are generated
+    from a fixed seed so hashes of grids with the same size can be compared
+    """
+    rng = random.Random(width << 16 | height)
+    return tuple(tuple(rng.getrandbits(64) for x in range(width)) for y in range(height))
+
+
+def hash_cells(cells: list[bytearray], keys: tuple[tuple[int, ...], ...]) -> int:
+    """Returns the Zobrist hash of the filled cells of a grid"""
+    result = 0
+    for y, row in enumerate(cells):
+        for x, cell in enumerate(row):
+            if cell:
+                result ^= keys[y][x]
+    return result
+
+
+def hash_row(mask: int, row_keys: tuple[int, ...]) -> int:
+    """Returns the Zobrist hash of a single row given as a bitmask"""
+    result = 0
+    while mask:
+        low = mask & -mask
+        result ^= row_keys[low.bit_length() - 1]
+        mask ^= low
+    return result
+
+
+def hash_rows(rows: tuple[int, ...], keys: tuple[tuple[int, ...], ...]) -> int:
+    """Returns the Zobrist hash of a grid given as row bitmasks"""
+    result = 0
+    for y, mask in enumerate(rows):
+        if mask:
+            result ^= hash_row(mask, keys[y])
+    return result
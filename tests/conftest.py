@@ -0,0 +1,5 @@
+"""The game's modules live flat in src and import each other by name."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
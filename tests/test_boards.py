@@ -0,0 +1,111 @@
+"""BoardBatch must answer every board of the batch like the Grid it was built from."""
+import random
+
+import pytest
+
+from batch import random_policy
+from grid import Grid
+from headless import Engine
+from piece import SHAPES, PType
+
+np = pytest.importorskip("numpy")
+BoardBatch = pytest.importorskip("boards").BoardBatch
+
+
+def played_grids(count: int, steps: int) -> list[Grid]:
+    """Returns the grids of count seeded games after steps random steps"""
+    grids = []
+    for seed in range(count):
+        engine = Engine(Grid(10, 20), seed)
+        rng = random.Random(seed)
+        for _step in range(steps):
+            engine.step(random_policy(engine, rng))
+        grids.append(engine.grid)
+    return grids
+
+
+def heights(grid: Grid) -> list[int]:
+    """Height of every column, 0 if empty"""
+    return [grid.height - next((y for y in range(grid.height) if grid.cells[y][x]), grid.height)
+            for x in range(grid.width)]
+
+
+def holes(grid: Grid) -> int:
+    """Number of empty cells with a filled cell above them"""
+    return sum(1 for x in range(grid.width) for y in range(grid.height)
+               if not grid.cells[y][x] and any(grid.cells[above][x] for above in range(y)))
+
+
+def test_queries_match_the_grids():
+    """Heights, holes, bumpiness and fits agree with the grids of real games"""
+    grids = played_grids(6, 300)
+    batch = BoardBatch.from_grids(grids)
+    assert batch.cells.shape == (6, 20, 10)
+    for i, grid in enumerate(grids):
+        column_heights = heights(grid)
+        assert batch.heights()[i].tolist() == column_heights
+        assert batch.holes()[i] == holes(grid)
+        assert batch.bumpiness()[i] == sum(
+            abs(left - right) for left, right in zip(column_heights, column_heights[1:]))
+    rng = random.Random(0)
+    for _query in range(200):
+        ptype = rng.choice(list(PType))
+        rotation = rng.randrange(4)
+        x = rng.randrange(-2, 10)
+        y = rng.randrange(-2, 20)
+        assert batch.try_fit(ptype, rotation, x, y).tolist() == \
+            [grid.fits(ptype, rotation, x, y) for grid in grids]
+
+
+def well_grids(count: int) -> list[Grid]:
+    """Returns grids whose 4 bottom rows are full except for a well in column i of grid i"""
+    grids = []
+    for well in range(count):
+        grid = Grid(10, 20)
+        full = bytes(PType.Z.value if x != well else 0 for x in range(10))
+        grid.restore((bytes(10),) * 16 + (full,) * 4)
+        grids.append(grid)
+    return grids
+
+
+def test_add_piece_and_clear_lines_match_the_grids():
+    """Adding the same pieces and clearing lines gives the same boards as the grids"""
+    grids = well_grids(6)
+    batch = BoardBatch.from_grids(grids)
+    copy = batch.copy()
+    rng = random.Random(1)
+    # Vertical I pieces into each well first, which clear 4 lines on one board at a time
+    moves = [(PType.I, 1, well - 2) for well in range(6)]
+    moves += [(rng.choice(list(PType)), rng.randrange(4), rng.randrange(-1, 10))
+              for _piece in range(40)]
+    for ptype, rotation, x in moves:
+        where = batch.try_fit(ptype, rotation, x, 0)
+        fits = [grid.fits(ptype, rotation, x, 0) for grid in grids]
+        assert where.tolist() == fits
+        distances = [grid.drop_distance(ptype, rotation, x, 0) if fit else None
+                     for grid, fit in zip(grids, fits)]
+        for distance in set(distances) - {None}:
+            selected = where & np.array([d == distance for d in distances])
+            batch.add_piece(ptype, rotation, x, distance, selected)
+        cleared = []
+        for grid, distance in zip(grids, distances):
+            if distance is None:
+                cleared.append(0)
+                continue
+            cells = [bytearray(row) for row in grid.cells]
+            for block_x, block_y in SHAPES[ptype][rotation].coords:
+                cells[distance + block_y][x + block_x] = ptype.value
+            grid.restore(tuple(bytes(row) for row in cells))
+            cleared.append(grid.clear_lines())
+        assert batch.clear_lines().tolist() == cleared
+        assert (batch.cells == BoardBatch.from_grids(grids).cells).all()
+    assert (copy.cells != batch.cells).any()
+
+
+def test_empty():
+    """Empty boards fit everything inside the board and have no height"""
+    batch = BoardBatch.empty(3, 10, 20)
+    assert batch.try_fit(PType.I, 0, 3, 0).all()
+    assert not batch.try_fit(PType.I, 0, 8, 0).any()
+    assert not batch.heights().any()
+    assert not batch.clear_lines().any()
@@ -0,0 +1,87 @@
+"""The bot must only choose placements the active piece can reach from where it is."""
+from bitgrid import BitGrid
+from bot import Bot
+from game import Action
+from grid import Grid
+from headless import Engine
+from piece import PType
+from placement import find_path
+
+
+def walled_engine(seed: int) -> Engine:
+    """Returns an engine whose piece fell to the right of a tall wall"""
+    engine = Engine(BitGrid(10, 20), seed)
+    game = engine.game
+    cells = [bytearray(10) for _y in range(20)]
+    for y in range(4, 20):
+        cells[y][2] = PType.Z.value
+    for y in range(14, 20):
+        for x in range(3, 9):
+            cells[y][x] = PType.Z.value
+    game.grid.restore(tuple(bytes(row) for row in cells))
+    game.spawn()
+    for _move in range(8):
+        game.act(Action.RIGHT)
+        game.fall()
+    return engine
+
+
+def test_plan_is_reachable_after_the_piece_moved():
+    """Plans made after gravity and inputs moved the piece can still be played"""
+    for seed in range(10):
+        engine = walled_engine(seed)
+        game = engine.game
+        bot = Bot(depth=1, use_hold=False)
+        piece = game.active_piece
+        _hold, placement = bot.plan(game)
+        assert find_path(game.grid, piece.type, (piece.x, piece.y, piece.rotation),
+                         placement) is not None
+        pieces = game.pieces
+        assert bot.play(game)
+        assert game.pieces == pieces + 1
+
+
+def test_bot_plays_with_gravity():
+    """The bot keeps playing when every piece has fallen a few rows before it moves"""
+    for grid_type in (Grid, BitGrid):
+        engine = Engine(grid_type(10, 20), 3)
+        game = engine.game
+        bot = Bot(depth=1)
+        for _piece in range(40):
+            if game.active_piece is None and not game.spawn():
+                break
+            for _fall in range(3):
+                game.fall()
+            if game.active_piece is not None:
+                assert bot.play(game)
+        assert game.pieces > 20
+
+
+def test_caches_do_not_leak_between_grid_sizes():
+    """Empty boards of every size hash to 0, a bot moving to another size must not reuse
+    the searches it cached for the old one
+    """
+    bot = Bot(depth=2)
+    for size in ((10, 20), (6, 12), (10, 20)):
+        game = Engine(BitGrid(*size), 8).game
+        game.spawn()
+        fresh = Bot(depth=2)
+        assert bot.plan(game) == fresh.plan(game)
+        # Searches from spawn, e.g. of the piece after a hold, are keyed by the hash only
+        queue = game.randomizer.peek(2)
+        rows = bot.board(game.grid)
+        assert bot.search(rows, 0, queue, 2) == fresh.search(rows, 0, queue, 2)
+
+
+def test_places_the_piece_when_the_next_one_cannot_be():
+    """A lookahead that finds no move for the next piece still places the current one"""
+    game = Engine(BitGrid(4, 6), 0).game
+    # Every placement of the O piece blocks the spawn of the T piece
+    game.grid.restore((bytes(4),) * 2 + (bytes([0, 1, 1, 1]),) * 4)
+    game.randomizer.restore(((PType.O,) + (PType.T,) * 6, ()))
+    game.spawn()
+    assert Bot(depth=1, use_hold=False).plan(game)[1] is not None
+    bot = Bot(depth=2, use_hold=False)
+    assert bot.plan(game)[1] is not None
+    assert bot.play(game)
+    assert game.pieces == 1
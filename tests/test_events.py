@@ -0,0 +1,85 @@
+"""Delivering and buffering game events."""
+from basestyle import NullStyle
+from events import (EventBus, GameReset, LinesCleared, NextChanged, PieceLocked, PieceMoved,
+                    PieceRotated, PieceSpawned, PieceState)
+from game import Action, Game
+from grid import Grid
+from piece import SHAPES, PType
+
+
+def state(x: int, y: int) -> PieceState:
+    """State of a T piece at x, y"""
+    return PieceState(PType.T, x, y, 0)
+
+
+def test_bus_delivers_by_type():
+    """Subscribers only get the events of their types, in the order they subscribed"""
+    bus = EventBus()
+    received = []
+    bus.subscribe(lambda event: received.append(("all", event)))
+    moved = bus.subscribe(lambda event: received.append(("moved", event)), PieceMoved)
+    bus.emit(PieceMoved(state(1, 1)))
+    bus.emit(GameReset(False))
+    bus.unsubscribe(moved)
+    bus.emit(PieceMoved(state(2, 1)))
+    assert received == [("all", PieceMoved(state(1, 1))), ("moved", PieceMoved(state(1, 1))),
+                        ("all", GameReset(False)), ("all", PieceMoved(state(2, 1)))]
+
+
+def test_drain_coalesces_within_a_piece():
+    """Only the last move, rotation and preview between lifecycle events are kept"""
+    queue = EventBus().queue()
+    events = [
+        PieceSpawned(state(4, 0)),
+        NextChanged((PType.I,)),
+        PieceMoved(state(4, 1)),
+        PieceRotated(state(4, 1)),
+        PieceMoved(state(5, 1)),
+        NextChanged((PType.O,)),
+        PieceMoved(state(5, 2)),
+        PieceLocked(state(5, 2), ((5, 2),)),
+        LinesCleared(1, (1, None)),
+        PieceSpawned(state(4, 0)),
+        PieceMoved(state(3, 0)),
+    ]
+    for event in events:
+        queue.put(event)
+    assert queue.drain(coalesce=True) == [
+        PieceSpawned(state(4, 0)),
+        PieceRotated(state(4, 1)),
+        NextChanged((PType.O,)),
+        PieceMoved(state(5, 2)),
+        PieceLocked(state(5, 2), ((5, 2),)),
+        LinesCleared(1, (1, None)),
+        PieceSpawned(state(4, 0)),
+        PieceMoved(state(3, 0)),
+    ]
+    assert not queue
+
+
+def test_drain_without_coalescing_keeps_everything():
+    """A plain drain returns every event in order and empties the queue"""
+    queue = EventBus().queue(PieceMoved)
+    for x in range(5):
+        queue.put(PieceMoved(state(x, 0)))
+    assert [event.piece.x for event in queue.drain()] == list(range(5))
+    assert not queue.drain()
+
+
+def test_game_events_carry_snapshots():
+    """Events keep the position the piece had when they were emitted"""
+    grid = Grid(10, 20)
+    game = Game(NullStyle(grid), grid, 1)
+    queue = game.events.queue(PieceSpawned, PieceMoved, PieceLocked)
+    game.spawn()
+    for _move in range(3):
+        game.act(Action.LEFT)
+    game.act(Action.HARD_DROP)
+    events = queue.drain()
+    assert isinstance(events[0], PieceSpawned)
+    assert isinstance(events[-1], PieceLocked)
+    moves = [event.piece.x for event in events if isinstance(event, PieceMoved)]
+    assert moves[:3] == [events[0].piece.x - 1, events[0].piece.x - 2, events[0].piece.x - 3]
+    locked = events[-1].piece
+    assert set(events[-1].cells) == {
+        (locked.x + x, locked.y + y) for x, y in SHAPES[locked.type][locked.rotation].coords}
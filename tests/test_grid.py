@@ -0,0 +1,86 @@
+"""Grid and BitGrid must agree on every query, including the incrementally kept state."""
+import random
+
+import pytest
+
+from batch import random_policy
+from bitgrid import BitGrid
+from grid import Grid
+from headless import Engine
+from piece import PType
+from zobrist import hash_cells
+
+
+def naive_drop_distance(grid: Grid, ptype: PType, rotation: int, x: int, y: int) -> int:
+    """Drop distance found by testing every row below the piece"""
+    distance = 0
+    while grid.fits(ptype, rotation, x, y + distance + 1):
+        distance += 1
+    return distance
+
+
+def naive_tops(grid: Grid) -> list[int]:
+    """y of the highest filled cell of every column, height if empty"""
+    return [next((y for y in range(grid.height) if grid.cells[y][x]), grid.height)
+            for x in range(grid.width)]
+
+
+def check_queries(grid: Grid, other: Grid, rng: random.Random) -> None:
+    """Compares both grids against each other and against naive implementations"""
+    assert grid.cells == other.cells
+    assert grid.get_grid() == other.get_grid()
+    assert grid.zobrist == other.zobrist == hash_cells(grid.cells, grid.keys)
+    assert grid.tops == other.tops == naive_tops(grid)
+    for _query in range(20):
+        ptype = rng.choice(list(PType))
+        rotation = rng.randrange(4)
+        x = rng.randrange(-2, grid.width)
+        y = rng.randrange(-2, grid.height)
+        assert grid.fits(ptype, rotation, x, y) == other.fits(ptype, rotation, x, y)
+        if grid.fits(ptype, rotation, x, y):
+            expected = naive_drop_distance(grid, ptype, rotation, x, y)
+            assert grid.drop_distance(ptype, rotation, x, y) == expected
+            assert other.drop_distance(ptype, rotation, x, y) == expected
+        new_rotation = rng.randrange(4)
+        assert grid.kick(ptype, x, y, rotation, new_rotation) == \
+            other.kick(ptype, x, y, rotation, new_rotation)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_grid_and_bitgrid_agree(seed):
+    """Plays the same seeded game on both grids and compares them after every step"""
+    engines = [Engine(Grid(10, 20), seed), Engine(BitGrid(10, 20), seed)]
+    policy_rngs = [random.Random(seed), random.Random(seed)]
+    rng = random.Random(seed)
+    for _step in range(1500):
+        results = [engine.step(random_policy(engine, policy_rng))
+                   for engine, policy_rng in zip(engines, policy_rngs)]
+        assert results[0] == results[1]
+        check_queries(engines[0].grid, engines[1].grid, rng)
+
+
+def test_clear_lines_shifts_rows_and_hash():
+    """Clearing full rows moves the rows above down, maps every old row to its new y
+    and keeps the hash incremental
+    """
+    for grid in (Grid(4, 6), BitGrid(4, 6)):
+        full = bytes([PType.I.value] * 4)
+        grid.restore((bytes(4),) * 2 + (bytes([0, 1, 0, 0]), full, bytes([2, 0, 0, 0]), full))
+        assert grid.clear_lines() == 2
+        assert grid.snapshot() == (bytes(4),) * 4 + (bytes([0, 1, 0, 0]), bytes([2, 0, 0, 0]))
+        assert grid.row_map == [2, 3, 4, None, 5, None]
+        assert grid.zobrist == hash_cells(grid.cells, grid.keys)
+        assert grid.tops == [5, 4, 6, 6]
+        assert grid.clear_lines() == 0
+
+
+def test_restore_matches_incremental_state():
+    """Restoring a snapshot gives the same state as building the board piece by piece"""
+    engine = Engine(BitGrid(10, 20), 5)
+    rng = random.Random(5)
+    for _step in range(800):
+        engine.step(random_policy(engine, rng))
+    for grid_type in (Grid, BitGrid):
+        grid = grid_type(10, 20)
+        grid.restore(engine.grid.snapshot())
+        check_queries(grid, engine.grid, rng)
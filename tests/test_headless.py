@@ -0,0 +1,80 @@
+"""Headless engine behaviour: forking and topping out."""
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from batch import random_policy
+from game import Action
+from grid import Grid
+from headless import Engine
+from piece import Piece, PType
+from zobrist import hash_cells
+
+
+def test_imports_without_tkinter():
+    """The engine and everything built on it must run on a Python without Tk"""
+    code = "import sys; sys.modules['tkinter'] = None; import batch, bot, headless, replay"
+    src = Path(__file__).resolve().parent.parent / "src"
+    subprocess.run([sys.executable, "-c", code], cwd=src, check=True)
+
+
+def test_fork_is_deterministic():
+    """A fork continues exactly like the engine it was forked from"""
+    engine = Engine(Grid(10, 20), 11)
+    rng = random.Random(11)
+    for _step in range(700):
+        engine.step(random_policy(engine, rng))
+    fork = engine.fork()
+    assert fork.game.snapshot() == engine.game.snapshot()
+    actions = [random_policy(engine, rng) for _step in range(1500)]
+    results = [engine.step(action) for action in actions]
+    assert [fork.step(action) for action in actions] == results
+    assert fork.game.snapshot() == engine.game.snapshot()
+
+
+def test_fork_is_independent():
+    """Stepping a fork does not change the engine it was forked from"""
+    engine = Engine(Grid(10, 20), 2)
+    engine.step()
+    state = engine.game.snapshot()
+    fork = engine.fork()
+    for _step in range(50):
+        fork.step(Action.HARD_DROP)
+    assert engine.game.snapshot() == state
+
+
+def blocked_spawn(engine: Engine) -> None:
+    """Fills the spawn area and moves the active piece below it"""
+    game = engine.game
+    engine.step()
+    cells = [bytearray(game.grid.width) for _y in range(game.grid.height)]
+    for y in range(4):
+        for x in range(3, 7):
+            cells[y][x] = PType.Z.value
+    game.grid.restore(tuple(bytes(row) for row in cells))
+    game.active_piece = Piece(0, None, PType.O)
+    game.active_piece.y = 10
+
+
+def test_hold_into_a_blocked_spawn_tops_out():
+    """Holding swaps in a piece at spawn, which tops out if it does not fit"""
+    engine = Engine(Grid(10, 20), 4)
+    blocked_spawn(engine)
+    result = engine.step(Action.HOLD)
+    game = engine.game
+    assert result.topped_out
+    assert game.top_outs == 1
+    assert not any(any(row) for row in game.grid.cells)
+    assert game.grid.zobrist == 0
+
+
+def test_hold_top_out_keeps_the_hash_in_sync():
+    """Games that keep playing after topping out by holding keep a consistent board"""
+    for seed in range(8):
+        engine = Engine(Grid(10, 20), seed)
+        rng = random.Random(seed)
+        for _step in range(2000):
+            engine.step(random_policy(engine, rng))
+            grid = engine.grid
+            assert grid.zobrist == hash_cells(grid.cells, grid.keys)
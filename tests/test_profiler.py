@@ -0,0 +1,48 @@
+"""The debug checks of the profiler must pass on real games and catch corrupted state."""
+import random
+
+import pytest
+
+from batch import random_policy
+from bitgrid import BitGrid
+from grid import Grid
+from headless import Engine
+from profiler import Profiler
+
+
+def play(engine: Engine, steps: int, seed: int) -> None:
+    """Steps the engine with random actions"""
+    rng = random.Random(seed)
+    for _step in range(steps):
+        engine.step(random_policy(engine, rng))
+
+
+@pytest.mark.parametrize("grid_type", [Grid, BitGrid])
+def test_checks_pass_on_real_games(grid_type):
+    """Locks, line clears, top outs and restores keep the grid consistent"""
+    engine = Engine(grid_type(10, 20), 6)
+    profiler = Profiler(engine.game, debug=True)
+    profiler.enable()
+    play(engine, 3000, 6)
+    engine.game.restore(engine.fork().game.snapshot())
+    play(engine, 500, 7)
+    counters = profiler.snapshot().counters
+    assert counters["debug.checked_rows"] > 0
+    assert counters.get("debug.errors", 0) == 0
+
+
+@pytest.mark.parametrize("grid_type", [Grid, BitGrid])
+def test_checks_catch_a_corrupted_grid(grid_type, capsys):
+    """A wrong hash, column top or row mask is reported by the next check"""
+    engine = Engine(grid_type(10, 20), 6)
+    profiler = Profiler(engine.game, debug=True)
+    profiler.enable()
+    play(engine, 200, 6)
+    grid = engine.grid
+    grid.zobrist ^= 1
+    grid.tops[0] = 0
+    play(engine, 200, 7)
+    assert profiler.snapshot().counters["debug.errors"] > 0
+    output = capsys.readouterr().out
+    assert "Hash is" in output
+    assert "column 0" in output
@@ -0,0 +1,63 @@
+"""Piece generators and the ring buffer queue of the randomizer."""
+import random
+from collections import Counter
+
+import pytest
+
+from piece import PType
+from randomizer import (GENERATORS, BagGenerator, FourteenBagGenerator, HistoryGenerator,
+                        Randomizer)
+
+
+def draws(randomizer: Randomizer, count: int) -> list[PType]:
+    """Draws count pieces"""
+    return [randomizer.draw() for _piece in range(count)]
+
+
+@pytest.mark.parametrize("generator, size", [(BagGenerator, 7), (FourteenBagGenerator, 14)])
+def test_bags_deal_every_piece(generator, size):
+    """Every bag contains the same number of copies of every piece"""
+    pieces = draws(Randomizer(random.Random(1), generator()), size * 50)
+    for start in range(0, len(pieces), size):
+        assert Counter(pieces[start:start + size]) == Counter(list(PType) * (size // 7))
+
+
+def test_history_generator():
+    """The first piece is never S, Z or O and recent pieces are rerolled"""
+    repeats = 0
+    for seed in range(200):
+        pieces = draws(Randomizer(random.Random(seed), HistoryGenerator()), 50)
+        assert pieces[0] in HistoryGenerator.first
+        repeats += sum(1 for i in range(4, 50) if pieces[i] in pieces[i - 4:i])
+    # Without the history about 3/4 of the pieces would repeat one of the last 4
+    assert repeats < 200 * 46 * 0.25
+
+
+def test_ring_buffer_grows_and_keeps_order():
+    """Peeking further than the capacity grows the buffer without changing the sequence"""
+    expected = draws(Randomizer(random.Random(3), capacity=16), 100)
+    randomizer = Randomizer(random.Random(3), capacity=2)
+    pieces = []
+    for depth in (1, 5, 3, 40, 2):
+        assert randomizer.peek(depth) == expected[len(pieces):len(pieces) + depth]
+        pieces += draws(randomizer, depth)
+        assert len(randomizer.buffer) & (len(randomizer.buffer) - 1) == 0
+    assert len(randomizer.buffer) >= 40
+    assert pieces + draws(randomizer, 100 - len(pieces)) == expected
+
+
+@pytest.mark.parametrize("name", list(GENERATORS))
+def test_snapshot_restore_continues_the_sequence(name):
+    """A restored randomizer with the same rng state continues with the same pieces"""
+    rng = random.Random(5)
+    randomizer = Randomizer(rng, GENERATORS[name]())
+    draws(randomizer, 10)
+    randomizer.peek(6)
+    state, rng_state, queued = randomizer.snapshot(), rng.getstate(), len(randomizer)
+    expected = draws(randomizer, 60)
+    other_rng = random.Random()
+    other_rng.setstate(rng_state)
+    other = Randomizer(other_rng, GENERATORS[name](), capacity=2)
+    other.restore(state)
+    assert len(other) == queued >= 6
+    assert draws(other, 60) == expected
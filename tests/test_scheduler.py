@@ -0,0 +1,104 @@
+"""The fixed timestep loop, timed with a fake clock so it does not depend on the machine."""
+import time
+from tkinter import TclError
+
+from basestyle import NullStyle
+from game import Game
+from grid import Grid
+from scheduler import Histogram, Scheduler
+
+
+class Clock:
+    """Replaces perf_counter and sleep, time passes by sleeping and by a microsecond
+    per reading, so waits too short to change a float still make progress
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def perf_counter(self) -> float:
+        """Returns the current fake time"""
+        self.now += 1e-6
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advances the fake time"""
+        self.now += seconds
+
+
+class Window:
+    """Stands in for Tk, stops the scheduler once the clock reached end"""
+
+    def __init__(self, clock: Clock, end: float, closed: bool = False) -> None:
+        self.clock = clock
+        self.end = end
+        self.closed = closed
+        self.scheduler = None
+
+    def update(self) -> None:
+        """Stops the loop (or acts like a closed window) once the time is up"""
+        if self.clock.now >= self.end:
+            if self.closed:
+                raise TclError("application has been destroyed")
+            self.scheduler.stop()
+
+
+def run(monkeypatch, seconds: float, tick_cost: float = 0.0, closed: bool = False) -> Scheduler:
+    """Runs a scheduler for seconds of fake time, every tick taking tick_cost seconds"""
+    clock = Clock()
+    monkeypatch.setattr(time, "perf_counter", clock.perf_counter)
+    monkeypatch.setattr(time, "sleep", clock.sleep)
+    grid = Grid(10, 20)
+    game = Game(NullStyle(grid), grid, 1)
+    tick = game.tick
+
+    def slow_tick() -> None:
+        tick()
+        clock.sleep(tick_cost)
+
+    game.tick = slow_tick
+    window = Window(clock, seconds, closed)
+    window.scheduler = Scheduler(game, window, tick_rate=100, render_rate=50)
+    window.scheduler.run()
+    return window.scheduler
+
+
+def test_histogram_buckets():
+    """Durations are counted in the first bucket they fit, beyond the last in the overflow"""
+    hist = Histogram()
+    for millis in (0.1, 0.2, 3, 3, 100):
+        hist.add(millis / 1000)
+    assert hist.counts[0] == 2
+    assert hist.counts[hist.bounds.index(4)] == 2
+    assert hist.counts[-1] == 1
+    assert hist.count == 5
+    assert abs(hist.mean() - 106.3 / 5) < 1e-9
+    assert hist.max == 100
+    assert hist.percentile(0.5) == 4
+    assert hist.percentile(1) == 100
+    assert Histogram().percentile(0.5) == 0.0
+
+
+def test_ticks_and_renders_at_their_own_rates(monkeypatch):
+    """A second of fast ticks runs every tick and every frame without dropping any"""
+    scheduler = run(monkeypatch, 1)
+    assert abs(scheduler.stats["tick"].count - 100) <= 1
+    assert abs(scheduler.stats["render"].count - 50) <= 1
+    assert scheduler.dropped_ticks == 0
+    assert scheduler.skipped_frames == 0
+    assert not scheduler.running
+
+
+def test_slow_ticks_drop_ticks_and_skip_frames(monkeypatch):
+    """Ticks slower than the tick rate are capped per loop and the missed frames skipped"""
+    scheduler = run(monkeypatch, 1, tick_cost=0.02)
+    assert scheduler.dropped_ticks > 0
+    assert scheduler.skipped_frames > 0
+    assert scheduler.stats["tick"].count < 100
+
+
+def test_closing_the_window_stops_the_loop(monkeypatch):
+    """The loop ends when updating the window fails because it was closed"""
+    scheduler = run(monkeypatch, 0.5, closed=True)
+    assert not scheduler.running
+    assert abs(scheduler.stats["tick"].count - 50) <= 1
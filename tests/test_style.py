@@ -0,0 +1,50 @@
+"""Behaviour shared by the canvas styles, drawn on the stub canvas of the benchmarks."""
+import pytest
+
+from bench import create_style
+from grid import Grid
+from piece import Piece, PType
+
+
+@pytest.mark.parametrize("name", ["rgb", "raster"])
+def test_resizes_are_laid_out_once(name):
+    """A burst of resize events is laid out once, for the last size"""
+    style = create_style(name, Grid(10, 20))
+    sizes = []
+    relayout = style.relayout
+
+    def counted_relayout():
+        sizes.append(style.canvas.width)
+        relayout()
+
+    style.relayout = counted_relayout
+    for width in range(400, 600, 10):
+        style.canvas.width = width
+        style.resize(None)
+    assert not sizes
+    style.canvas.run_timers()
+    assert sizes == [590]
+    assert style.resize_job is None
+
+
+@pytest.mark.parametrize("name", ["rgb", "raster"])
+def test_ghost_is_only_searched_when_the_landing_position_may_change(name):
+    """Falling straight down keeps the ghost, moving sideways or invalidating recomputes it"""
+    grid = Grid(10, 20)
+    style = create_style(name, grid)
+    searches = []
+    drop_distance = grid.drop_distance
+    grid.drop_distance = lambda *args: searches.append(args) or drop_distance(*args)
+    piece = Piece(4, None, PType.T)
+    style.active_piece = piece
+    style.draw_piece(piece, True)
+    style.draw_piece(piece, True)
+    piece.y += 1
+    style.draw_piece(piece, True)
+    assert len(searches) == 1
+    piece.x += 1
+    style.draw_piece(piece, True)
+    style.invalidate()
+    style.draw_piece(piece, True)
+    assert len(searches) == 3
+    assert style.ghost_state == (PType.T, 5, 0, 18)